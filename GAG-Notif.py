@@ -1,5 +1,6 @@
 import os
 import json
+import logging
 import discord
 import asyncio
 from discord.ext import commands, tasks
@@ -7,46 +8,428 @@ from discord import app_commands
 from discord.ui import View, Button
 import aiohttp
 from dotenv import load_dotenv
+from event_store import EventStore, item_key
+from broker import BrokerClient, EventBroker
+from webhooks import UNKNOWN_WEBHOOK, WebhookPool
+from payloads import PayloadError, StockPayload, WeatherPayload, decode_stock, decode_weather
+from pipeline import EventPipeline
+from catalog import NameIndex, file_signature, load_catalog, normalize_name
+from telemetry import (
+    Counter, Gauge, Histogram, RateLimitCounter, setup_logging, start_metrics_server, stop_logging, watch_loop_lag
+)
 from datetime import datetime, timezone, timedelta
 import time
+import hashlib
+import random
+import tempfile
+import heapq
+import weakref
+from collections import deque
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process only, nothing to lock against
+    fcntl = None
 
 load_dotenv()
 TOKEN = os.getenv("DISCORD_BOT_TOKEN")
 
-CONFIG_FILE = "channels.json"
+# --- Logging and metrics ---
+setup_logging(os.getenv("LOG_LEVEL", "INFO").upper())
+log = logging.getLogger("gag")
+
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))  # 0 disables the /metrics endpoint
+
+poll_latency     = Histogram("gag_poll_latency_seconds", "Upstream API request latency, by feed")
+upstream_errors  = Counter("gag_upstream_errors_total", "Failed upstream API requests, by feed and reason")
+discord_latency  = Histogram("gag_discord_request_seconds", "Discord send, edit and DM latency, by operation")
+discord_failures = Counter("gag_discord_failures_total", "Discord requests that failed, by operation")
+rate_limits      = Counter("gag_discord_rate_limits_total", "Rate limits reported by discord.py, by scope")
+loop_lag         = Gauge("gag_event_loop_lag_seconds", "How late the event loop wakes from a 1s sleep")
+events_emitted   = Counter("gag_events_total", "New upstream events found by the ingestion pipeline, by kind")
+countdown_edits  = Counter("gag_countdown_edits_total", "Countdown edits, by result (sent, or skipped as unchanged)")
+Gauge("gag_upstream_circuit_open", "1 while a feed's circuit breaker is open, by feed",
+      fn=lambda: {(("feed", f.name),): int(f.breaker.state == "open") for f in (stock_feed, weather_feed)})
+Gauge("gag_upstream_snapshot_age_seconds", "Age of the last good payload, by feed",
+      fn=lambda: {(("feed", f.name),): f.age() for f in (stock_feed, weather_feed) if f.age() is not None})
+Gauge("gag_upstream_stale", "1 while a feed is served from its last good payload, by feed",
+      fn=lambda: {(("feed", f.name),): int(f.stale) for f in (stock_feed, weather_feed)})
+Gauge("gag_active_events", "Events whose messages are kept up to date, by kind",
+      fn=lambda: {(("kind", kind),): len(events) for kind, events in active_events.items()})
+
+logging.getLogger("discord.http").addHandler(RateLimitCounter(rate_limits))
+logging.getLogger("discord.webhook.async_").addHandler(RateLimitCounter(rate_limits))
+
+CONFIG_FILE = "channels.json"  # legacy single-guild channel config
+REGISTRY_FILE = "subscriptions.json"
 LAST_STATE_FILE = "last_state.json"
+EVENT_DB_FILE = "events.db"
+WATCH_FILE = "watches.json"
+WEBHOOK_FILE = "webhooks.json"
+CATALOG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalog.json")
 
-# --- Load and Save Channel IDs ---
-def load_channels():
-    global seed_channel_id, gear_channel_id, egg_channel_id
-    global cosmetic_channel_id, announcement_channel_id, weather_channel_id
-    global event_stock_channel_id
+# Every alert category a channel can subscribe to
+CHANNEL_CATEGORIES = ("seed", "gear", "egg", "cosmetic", "event_stock", "announcement", "weather")
 
-    if not os.path.isfile(CONFIG_FILE):
-        return
-    with open(CONFIG_FILE, "r") as f:
-        data = json.load(f)
-
-    seed_channel_id         = data.get("seed_channel_id")
-    gear_channel_id         = data.get("gear_channel_id")
-    egg_channel_id          = data.get("egg_channel_id")
-    cosmetic_channel_id     = data.get("cosmetic_channel_id")
-    announcement_channel_id = data.get("announcement_channel_id")
-    weather_channel_id      = data.get("weather_channel_id")
-    event_stock_channel_id  = data.get("event_stock_channel_id")
-
-def save_channels():
-    data = {
-        "seed_channel_id":         seed_channel_id,
-        "gear_channel_id":         gear_channel_id,
-        "egg_channel_id":          egg_channel_id,
-        "cosmetic_channel_id":     cosmetic_channel_id,
-        "announcement_channel_id": announcement_channel_id,
-        "weather_channel_id":      weather_channel_id,
-        "event_stock_channel_id":  event_stock_channel_id
-    }
-    with open(CONFIG_FILE, "w") as f:
-        json.dump(data, f, indent=2)
+# Guild bucket for channels migrated from channels.json until their guild is known
+UNKNOWN_GUILD = 0
+
+# Sharding. Left unset, this process runs every shard Discord recommends. To
+# split shards across processes, give each the same SHARD_COUNT, its own
+# SHARD_IDS (e.g. "0,1") and a shared BROKER_PATH; exactly one of them is
+# elected to poll the upstream APIs and publishes what it finds to the rest.
+SHARD_COUNT = int(os.environ["SHARD_COUNT"]) if os.getenv("SHARD_COUNT") else None
+SHARD_IDS   = [int(i) for i in os.getenv("SHARD_IDS", "").split(",") if i.strip()] or None
+BROKER_PATH = os.getenv("BROKER_PATH")  # Unix socket the poller publishes events on
+
+# Webhook delivery: alerts and their countdown edits go out through a webhook
+# per channel, off the bot's global rate limit, so commands stay responsive at
+# any fan-out. Channels where the bot can't manage webhooks get alerts as before.
+WEBHOOK_DELIVERY = os.getenv("WEBHOOK_DELIVERY", "").lower() in ("1", "true", "yes")
+
+def owns_guild(guild_id: int) -> bool:
+    """Whether this process's shards serve `guild_id`, by Discord's shard formula"""
+    if SHARD_IDS is None or guild_id == UNKNOWN_GUILD:
+        return True
+    return (guild_id >> 22) % SHARD_COUNT in SHARD_IDS
+
+# --- Atomic, Debounced JSON Persistence ---
+SAVE_DEBOUNCE = 2.0  # seconds of quiet before dirty state is written
+
+def write_json_atomic(path: str, data):
+    """Write JSON to a temp file, fsync it and rename it over `path`"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def update_json_locked(path: str, changes: dict, merge):
+    """Write `merge(current, changes)` back to a JSON file other processes also update"""
+    with open(path + ".lock", "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            with open(path, "r") as f:
+                current = json.load(f)
+        except FileNotFoundError:
+            current = {}
+        write_json_atomic(path, merge(current, changes))
+
+class DebouncedWriter:
+    """Coalesces saves of one JSON file and writes them off the event loop.
+
+    `snapshot` runs on the loop and must return a detached copy of the data;
+    encoding and disk I/O happen in a worker thread. With `merge`, the
+    snapshot is instead a dict of changed keys that is merged into the file
+    under a lock, so processes sharing the file don't overwrite each other.
+    """
+
+    def __init__(self, path: str, snapshot, delay: float = SAVE_DEBOUNCE, merge=None):
+        self.path = path
+        self.snapshot = snapshot
+        self.delay = delay
+        self.merge = merge
+        self._dirty = False
+        self._unsaved = {}  # changes from a failed merge, retried with the next ones
+        self._timer = None
+        self._lock = asyncio.Lock()
+
+    def mark_dirty(self):
+        self._dirty = True
+        if self._timer is None or self._timer.done():
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.delay)
+        # Saves requested while this one writes get a timer of their own
+        self._timer = None
+        await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            data = self.snapshot()
+            try:
+                if self.merge is None:
+                    await asyncio.to_thread(write_json_atomic, self.path, data)
+                else:
+                    data = {**self._unsaved, **data}
+                    await asyncio.to_thread(update_json_locked, self.path, data, self.merge)
+                    self._unsaved = {}
+            except Exception as e:
+                self._dirty = True
+                if self.merge is not None:
+                    self._unsaved = data
+                log.error("Failed to save %s: %s", self.path, e)
+
+# --- Channel Registry ---
+class ChannelRegistry:
+    """Which channels, in which guilds, receive each alert category.
+
+    `_guilds` holds guild -> category -> channel ids. `_by_category` is a flat
+    index kept in step with it, so fan-out is a single dict lookup. Guilds
+    changed since the last save are tracked so only they are written back.
+    """
+
+    def __init__(self):
+        self._guilds = {}
+        self._by_category = {c: set() for c in CHANNEL_CATEGORIES}
+        self._touched = set()
+
+    def add(self, guild_id: int, category: str, channel_id: int):
+        self._guilds.setdefault(guild_id, {}).setdefault(category, set()).add(channel_id)
+        self._by_category[category].add(channel_id)
+        self._touched.add(guild_id)
+
+    def remove(self, guild_id: int, category: str, channel_id: int) -> bool:
+        channels = self._guilds.get(guild_id, {}).get(category)
+        if not channels or channel_id not in channels:
+            return False
+        channels.discard(channel_id)
+        if not channels:
+            del self._guilds[guild_id][category]
+            if not self._guilds[guild_id]:
+                del self._guilds[guild_id]
+        self._by_category[category].discard(channel_id)
+        self._touched.add(guild_id)
+        return True
+
+    def remove_channel(self, guild_id: int, channel_id: int) -> list:
+        """Drop a channel from every category; returns the categories it had"""
+        return [c for c in CHANNEL_CATEGORIES if self.remove(guild_id, c, channel_id)]
+
+    def remove_guild(self, guild_id: int):
+        for category, channels in self._guilds.pop(guild_id, {}).items():
+            self._by_category[category].difference_update(channels)
+        self._touched.add(guild_id)
+
+    def channels_for(self, category: str) -> set:
+        """Live set of channel ids subscribed to `category` across all guilds"""
+        return self._by_category[category]
+
+    def guild_channels(self, guild_id: int, category: str) -> set:
+        return self._guilds.get(guild_id, {}).get(category, set())
+
+    def adopt_unknown(self, guild_of) -> bool:
+        """Move legacy channels under the guild `guild_of(channel_id)` resolves to"""
+        moved = False
+        for category, channels in list(self._guilds.get(UNKNOWN_GUILD, {}).items()):
+            for channel_id in list(channels):
+                guild_id = guild_of(channel_id)
+                if guild_id is not None:
+                    self.remove(UNKNOWN_GUILD, category, channel_id)
+                    self.add(guild_id, category, channel_id)
+                    moved = True
+        return moved
+
+    def _guild_dict(self, guild_id: int) -> dict:
+        return {category: sorted(channels) for category, channels in self._guilds.get(guild_id, {}).items()}
+
+    def to_dict(self) -> dict:
+        return {str(guild_id): self._guild_dict(guild_id) for guild_id in self._guilds}
+
+    def take_changes(self) -> dict:
+        """{guild_id: categories} for guilds changed since the last call; {} marks a removed guild"""
+        changes = {str(guild_id): self._guild_dict(guild_id) for guild_id in self._touched}
+        self._touched.clear()
+        return changes
+
+    def load_dict(self, data: dict, keep=None):
+        """Load saved subscriptions, only for guilds `keep(guild_id)` accepts if given"""
+        for guild_id, categories in data.items():
+            if keep is not None and not keep(int(guild_id)):
+                continue
+            for category, channels in categories.items():
+                if category not in CHANNEL_CATEGORIES:
+                    continue
+                for channel_id in channels:
+                    self.add(int(guild_id), category, channel_id)
+        self._touched.clear()
+
+def merge_keyed(current: dict, changes: dict) -> dict:
+    """Replace the changed top-level keys of a saved dict; empty values delete the key"""
+    for key, value in changes.items():
+        if value:
+            current[key] = value
+        else:
+            current.pop(key, None)
+    return current
+
+registry = ChannelRegistry()
+
+# --- Load and Save Channel Subscriptions ---
+def load_registry():
+    if os.path.isfile(REGISTRY_FILE):
+        with open(REGISTRY_FILE, "r") as f:
+            registry.load_dict(json.load(f), keep=owns_guild)
+    elif os.path.isfile(CONFIG_FILE):
+        # Pre-registry config; guilds are filled in once the bot can see the channels
+        log.warning("Migrating channels.json into the channel registry")
+        with open(CONFIG_FILE, "r") as f:
+            data = json.load(f)
+        for category in CHANNEL_CATEGORIES:
+            channel_id = data.get(f"{category}_channel_id")
+            if channel_id:
+                registry.add(UNKNOWN_GUILD, category, channel_id)
+
+registry_writer = DebouncedWriter(REGISTRY_FILE, registry.take_changes, merge=merge_keyed)
+
+def save_registry():
+    registry_writer.mark_dirty()
+
+# --- Item Watches ---
+# Stock categories whose rotations are matched against item watches
+WATCH_CATEGORIES = ("seed", "gear", "egg")
+WATCH_LIMIT      = 25  # items a single user or role can watch
+
+class WatchRegistry:
+    """Which users and roles want to hear about which stock items.
+
+    Targets are ("user", user_id) for DM alerts or ("role", channel_id, role_id)
+    for role pings in a channel. `_by_item` is the inverted index used for
+    matching, so a rotation costs one lookup per item in it no matter how
+    many watches exist; `_by_target` serves listing and removal.
+    """
+
+    def __init__(self):
+        self._by_item = {}
+        self._by_target = {}
+        self._touched = set()
+
+    def add(self, target: tuple, item_id: str) -> bool:
+        items = self._by_target.setdefault(target, set())
+        if item_id in items:
+            return False
+        items.add(item_id)
+        self._by_item.setdefault(item_id, set()).add(target)
+        self._touched.add(target)
+        return True
+
+    def remove(self, target: tuple, item_id: str) -> bool:
+        items = self._by_target.get(target)
+        if not items or item_id not in items:
+            return False
+        items.discard(item_id)
+        if not items:
+            del self._by_target[target]
+        watchers = self._by_item[item_id]
+        watchers.discard(target)
+        if not watchers:
+            del self._by_item[item_id]
+        self._touched.add(target)
+        return True
+
+    def remove_target(self, target: tuple) -> int:
+        items = list(self._by_target.get(target, ()))
+        for item_id in items:
+            self.remove(target, item_id)
+        return len(items)
+
+    def remove_channel(self, channel_id: int) -> int:
+        """Drop every role watch that pings in `channel_id`"""
+        targets = [t for t in self._by_target if t[0] == "role" and t[1] == channel_id]
+        return sum(self.remove_target(t) for t in targets)
+
+    def items_for(self, target: tuple) -> set:
+        return self._by_target.get(target, set())
+
+    def match(self, item_ids) -> dict:
+        """{target: [item_id, ...]} for every watcher of the given items"""
+        matched = {}
+        for item_id in item_ids:
+            for target in self._by_item.get(item_id, ()):
+                matched.setdefault(target, []).append(item_id)
+        return matched
+
+    def __len__(self):
+        return sum(len(items) for items in self._by_target.values())
+
+    @staticmethod
+    def _file_key(target: tuple) -> tuple:
+        """(section, key) a target is saved under in watches.json"""
+        if target[0] == "user":
+            return "users", str(target[1])
+        return "roles", f"{target[1]}:{target[2]}"
+
+    def to_dict(self) -> dict:
+        data = {"users": {}, "roles": {}}
+        for target, items in self._by_target.items():
+            section, key = self._file_key(target)
+            data[section][key] = sorted(items)
+        return data
+
+    def take_changes(self) -> dict:
+        """{(section, key): items} for targets changed since the last call; [] marks a removal"""
+        changes = {self._file_key(t): sorted(self._by_target.get(t, ())) for t in self._touched}
+        self._touched.clear()
+        return changes
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self._touched)
+
+    def load_dict(self, data: dict):
+        for user_id, items in data.get("users", {}).items():
+            for item_id in items:
+                self.add(("user", int(user_id)), item_id)
+        roles = data.get("roles", {})
+        if isinstance(roles, list):  # files written before roles were keyed
+            roles = {f"{r['channel_id']}:{r['role_id']}": r["items"] for r in roles}
+        for key, items in roles.items():
+            channel_id, role_id = key.split(":")
+            for item_id in items:
+                self.add(("role", int(channel_id), int(role_id)), item_id)
+        self._touched.clear()
+
+def merge_watch_changes(current: dict, changes: dict) -> dict:
+    merged = WatchRegistry()
+    merged.load_dict(current)  # normalises older layouts
+    data = merged.to_dict()
+    for (section, key), items in changes.items():
+        if items:
+            data[section][key] = items
+        else:
+            data[section].pop(key, None)
+    return data
+
+watches = WatchRegistry()
+
+def load_watches():
+    global watch_signature
+    if os.path.isfile(WATCH_FILE):
+        with open(WATCH_FILE, "r") as f:
+            watches.load_dict(json.load(f))
+        watch_signature = file_signature(WATCH_FILE)
+
+watch_writer = DebouncedWriter(WATCH_FILE, watches.take_changes, merge=merge_watch_changes)
+watch_signature = None
+
+def reload_watches() -> bool:
+    """Pick up watches other processes saved; skipped while local changes are unsaved"""
+    global watches, watch_signature
+    signature = file_signature(WATCH_FILE) if os.path.isfile(WATCH_FILE) else None
+    if signature == watch_signature or watches.has_changes or watch_writer._dirty:
+        return False
+    fresh = WatchRegistry()
+    if signature is not None:
+        with open(WATCH_FILE, "r") as f:
+            fresh.load_dict(json.load(f))
+    watches, watch_signature = fresh, signature
+    watch_writer.snapshot = watches.take_changes
+    return True
+
+def save_watches():
+    watch_writer.mark_dirty()
 
 # --- Load and Save Last Sent State ---
 def load_last_state():
@@ -67,34 +450,366 @@ def load_last_state():
     
     # Convert legacy weather format (list) to new dict format
     if isinstance(last_state.get("weather"), list):
-        print("⚠️ Migrating weather state from list to dict")
+        log.warning("Migrating weather state from list to dict")
         last_state["weather"] = {}
 
+def snapshot_last_state() -> dict:
+    return {k: dict(v) if isinstance(v, dict) else v for k, v in last_state.items()}
+
+state_writer = DebouncedWriter(LAST_STATE_FILE, snapshot_last_state)
+
 def save_last_state():
-    with open(LAST_STATE_FILE, "w") as f:
-        json.dump(last_state, f, indent=2)
+    state_writer.mark_dirty()
 
 # Bot Setup
 intents = discord.Intents.default()
 intents.message_content = True
-bot = commands.Bot(command_prefix="!", intents=intents)
 
-# Channel placeholders
-seed_channel_id = gear_channel_id = egg_channel_id = None
-cosmetic_channel_id = announcement_channel_id = weather_channel_id = None
-event_stock_channel_id = None
+class NotifierBot(commands.AutoShardedBot):
+    metrics_runner = None
+    lag_task = None
+
+    async def setup_hook(self):
+        self.lag_task = asyncio.create_task(watch_loop_lag(loop_lag))
+        if METRICS_PORT:
+            try:
+                self.metrics_runner = await start_metrics_server(METRICS_HOST, METRICS_PORT)
+                log.info("Metrics at http://%s:%d/metrics", METRICS_HOST, METRICS_PORT)
+            except OSError as e:
+                log.error("Metrics endpoint disabled: %s", e)
+
+    async def close(self):
+        # Flush pending state and release pooled upstream connections before the gateway goes down
+        if broker_client is not None:
+            broker_client.stop()
+            await broker.close()
+        await ingest.stop()
+        await watch_notifier.flush()
+        await edit_scheduler.stop()
+        rollover_scheduler.stop()
+        await state_writer.flush()
+        await registry_writer.flush()
+        await watch_writer.flush()
+        if webhook_pool is not None:
+            await webhook_pool.close()
+            await webhook_writer.flush()
+        await event_store.close()
+        await close_http_session()
+        if self.lag_task:
+            self.lag_task.cancel()
+        if self.metrics_runner:
+            await self.metrics_runner.cleanup()
+        await super().close()
+
+bot = NotifierBot(command_prefix="!", intents=intents, shard_count=SHARD_COUNT, shard_ids=SHARD_IDS)
 
-load_channels()
+load_registry()
+load_watches()
 load_last_state()
 
-# Lock for state access
-state_lock = asyncio.Lock()
+# History of every rotation, weather occurrence and announcement
+event_store = EventStore(EVENT_DB_FILE)
+event_store.open()
 
 # Constants
 STOCK_API_URL   = "YOUR_API"
 WEATHER_API_URL = "YOUR_API"
 INVITE_URL      = "bot invite url here"
 
+# Shared HTTP client settings for upstream API calls
+HTTP_POOL_LIMIT     = 20    # total open connections
+HTTP_POOL_PER_HOST  = 10    # connections per upstream host
+HTTP_DNS_CACHE_TTL  = 300   # seconds to cache DNS lookups
+HTTP_KEEPALIVE      = 60    # seconds to keep idle connections open
+HTTP_TIMEOUT = aiohttp.ClientTimeout(total=15, connect=5, sock_read=10)
+
+http_session = None
+
+def get_http_session() -> aiohttp.ClientSession:
+    """Return the bot-wide upstream session, creating it on first use"""
+    global http_session
+    if http_session is None or http_session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_LIMIT,
+            limit_per_host=HTTP_POOL_PER_HOST,
+            ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+            keepalive_timeout=HTTP_KEEPALIVE
+        )
+        http_session = aiohttp.ClientSession(connector=connector, timeout=HTTP_TIMEOUT)
+    return http_session
+
+async def close_http_session():
+    global http_session
+    if http_session is not None and not http_session.closed:
+        await http_session.close()
+    http_session = None
+
+# Upstream resilience: retries inside one poll, a breaker across polls
+UPSTREAM_ATTEMPTS     = 3    # tries per poll before it counts as a failure
+UPSTREAM_BACKOFF      = 0.5  # seconds before the first retry, doubled after each
+BREAKER_THRESHOLD     = 5    # consecutive failed polls that open the circuit
+BREAKER_COOLDOWN      = 30   # seconds the circuit stays open before a trial poll
+BREAKER_MAX_COOLDOWN  = 300  # cap for the cooldown, which doubles after each failed trial
+
+class UpstreamError(Exception):
+    def __init__(self, reason: str, retryable: bool = True):
+        super().__init__(reason)
+        self.reason = reason
+        self.retryable = retryable
+
+class CircuitBreaker:
+    """Stops calling an upstream that keeps failing.
+
+    Opens after `threshold` consecutive failures. Once `cooldown` has passed
+    one trial call is let through; if it fails the circuit reopens for twice
+    as long (up to `max_cooldown`), if it succeeds the circuit closes.
+    """
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, cooldown: float = BREAKER_COOLDOWN,
+                 max_cooldown: float = BREAKER_MAX_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.current_cooldown = cooldown
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.current_cooldown:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        return self.state != "open"
+
+    def record_success(self) -> bool:
+        """Returns True if this closed an open circuit"""
+        was_open = self.opened_at is not None
+        self.failures = 0
+        self.opened_at = None
+        self.current_cooldown = self.cooldown
+        return was_open
+
+    def record_failure(self) -> bool:
+        """Returns True if this (re)opened the circuit"""
+        self.failures += 1
+        if self.opened_at is not None:
+            # The half-open trial failed
+            self.current_cooldown = min(self.max_cooldown, self.current_cooldown * 2)
+            self.opened_at = time.monotonic()
+            return True
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+            return True
+        return False
+
+# Upstream snapshots: one in-flight request per feed, reused for a few seconds
+SNAPSHOT_TTL = 3  # seconds a parsed response is served to every caller
+
+class FeedSnapshot:
+    """Short-lived, single-flight cache of one upstream JSON feed.
+
+    Polls are conditional (ETag / Last-Modified) and the raw body is hashed,
+    so `version` only moves when the upstream payload really changed. Bodies
+    are turned into typed payloads by `decode`; one that doesn't decode
+    counts as a failed poll. Failed
+    polls are retried with backoff; when they still fail, or while the
+    breaker is open, callers get the last good payload with `stale` set.
+    """
+
+    def __init__(self, name: str, url: str, decode, ttl: float = SNAPSHOT_TTL):
+        self.name = name
+        self.url = url
+        self.decode = decode
+        self.ttl = ttl
+        self.data = None
+        self.fetched_at = 0.0
+        self.version = 0
+        self.etag = None
+        self.last_modified = None
+        self.body_hash = None
+        self.stale = False
+        self.breaker = CircuitBreaker()
+        self._inflight = None
+
+    async def get(self, max_age: float = None):
+        """Return the parsed payload, or None if there has never been a good one.
+
+        `max_age` overrides the TTL for callers that need a fresher copy.
+        """
+        ttl = self.ttl if max_age is None else max_age
+        if self.data is not None and time.monotonic() - self.fetched_at < ttl:
+            return self.data
+        if not self.breaker.allow():
+            self.stale = self.data is not None
+            return self.data
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._fetch())
+        # Shield so one cancelled caller doesn't abort the fetch for everyone
+        return await asyncio.shield(self._inflight)
+
+    def age(self):
+        """Seconds since the last good response, or None before the first one"""
+        return time.monotonic() - self.fetched_at if self.data is not None else None
+
+    async def _fetch(self):
+        try:
+            delay = UPSTREAM_BACKOFF
+            for attempt in range(1, UPSTREAM_ATTEMPTS + 1):
+                try:
+                    data = await self._request()
+                except UpstreamError as e:
+                    upstream_errors.inc(feed=self.name, reason=e.reason)
+                    if not e.retryable or attempt == UPSTREAM_ATTEMPTS:
+                        log.warning("%s API failed after %d attempts: %s", self.name, attempt, e)
+                        break
+                    log.info("%s API attempt %d failed, retrying in %.1fs: %s", self.name, attempt, delay, e)
+                    await asyncio.sleep(delay + random.uniform(0, delay / 2))
+                    delay *= 2
+                else:
+                    if self.breaker.record_success():
+                        log.info("%s API recovered, circuit closed", self.name)
+                    self.stale = False
+                    return data
+
+            if self.breaker.record_failure():
+                log.error("%s API circuit open for %.0fs", self.name, self.breaker.current_cooldown)
+            self.stale = self.data is not None
+            if self.stale:
+                log.warning("Serving %s snapshot from %.0fs ago", self.name, self.age())
+            return self.data
+        finally:
+            self._inflight = None
+
+    async def _request(self):
+        headers = {}
+        if self.data is not None:
+            if self.etag:
+                headers["If-None-Match"] = self.etag
+            if self.last_modified:
+                headers["If-Modified-Since"] = self.last_modified
+        started = time.perf_counter()
+        try:
+            session = get_http_session()
+            async with session.get(self.url, headers=headers) as r:
+                poll_latency.observe(time.perf_counter() - started, feed=self.name)
+                if r.status == 304 and self.data is not None:
+                    self.fetched_at = time.monotonic()
+                    return self.data
+                if r.status != 200:
+                    # Server errors and rate limits are worth retrying, other client errors aren't
+                    raise UpstreamError(f"http_{r.status}", retryable=r.status >= 500 or r.status == 429)
+                if r.content_type != 'application/json':
+                    text = await r.text(errors="replace")
+                    log.warning("%s API returned non-JSON", self.name, extra={"body": text[:200]})
+                    raise UpstreamError("non_json")
+                body = await r.read()
+                etag = r.headers.get("ETag")
+                last_modified = r.headers.get("Last-Modified")
+        except UpstreamError:
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise UpstreamError(type(e).__name__) from e
+        except Exception as e:
+            # Anything else still counts as a failed poll, so the polling loops keep running
+            log.exception("%s API request failed unexpectedly: %s", self.name, e)
+            raise UpstreamError("unexpected") from e
+
+        # Upstream without validators: skip parsing if the bytes are identical
+        body_hash = hashlib.blake2b(body, digest_size=16).digest()
+        if body_hash == self.body_hash and self.data is not None:
+            self.etag, self.last_modified = etag, last_modified
+            self.fetched_at = time.monotonic()
+            return self.data
+
+        try:
+            payload = self.decode(body)
+        except PayloadError as e:
+            # Same bytes would fail the same way; let the breaker decide when to try again
+            log.warning("%s API returned a malformed payload: %s", self.name, e)
+            raise UpstreamError("bad_payload", retryable=False) from e
+        except Exception as e:
+            log.exception("%s API payload failed to decode: %s", self.name, e)
+            raise UpstreamError("bad_payload", retryable=False) from e
+        self.data = payload
+        self.body_hash = body_hash
+        self.etag = etag
+        self.last_modified = last_modified
+        self.version += 1
+        self.fetched_at = time.monotonic()
+        return payload
+
+stock_feed   = FeedSnapshot("Stock", STOCK_API_URL, lambda body: decode_stock(body, STOCK_API_KEYS))
+weather_feed = FeedSnapshot("Weather", WEATHER_API_URL, decode_weather)
+
+# --- Adaptive polling ---
+CADENCE_SMOOTHING    = 0.3  # weight of the newest gap in the running average
+NEAR_CHANGE_FRACTION = 0.1  # how close to an expected change counts as "near"
+
+class PollController:
+    """Chooses a feed's next poll delay from how often its payload has changed.
+
+    `observe` is fed the upstream timestamp of each new event; the average gap
+    between them predicts the next change. Polls run at `min_interval` around
+    that prediction and stretch towards `max_interval` in quiet stretches.
+    """
+
+    def __init__(self, name: str, min_interval: float, max_interval: float, default_interval: float):
+        self.name = name
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.default_interval = default_interval
+        self.last_change = None
+        self.mean_gap = None
+        self.next_due = 0.0
+
+    def observe(self, change_ts):
+        if not change_ts or (self.last_change is not None and change_ts <= self.last_change):
+            return
+        if self.last_change is not None:
+            gap = change_ts - self.last_change
+            if self.mean_gap is None:
+                self.mean_gap = gap
+            else:
+                self.mean_gap += CADENCE_SMOOTHING * (gap - self.mean_gap)
+        self.last_change = change_ts
+
+    def interval(self, now: float = None) -> float:
+        if self.mean_gap is None:
+            return self.default_interval
+        now = time.time() if now is None else now
+        until = self.last_change + self.mean_gap - now
+        window = max(self.min_interval * 3, self.mean_gap * NEAR_CHANGE_FRACTION)
+        if until > window:
+            delay = until - window   # quiet: sleep until the change gets close
+        elif until > -window:
+            delay = self.min_interval  # a change is due any moment
+        else:
+            delay = -until / 4       # overdue: back off the longer it stays quiet
+        return min(self.max_interval, max(self.min_interval, delay))
+
+    def due(self, now: float = None) -> bool:
+        return (time.time() if now is None else now) >= self.next_due
+
+    def plan(self) -> float:
+        """Schedule the next poll and return the delay until it"""
+        now = time.time()
+        delay = self.interval(now)
+        self.next_due = now + delay
+        return delay
+
+# (min, max, default) seconds between polls for each feed
+stock_poll        = PollController("stock", 30, 600, 300)
+weather_poll      = PollController("weather", 10, 120, 20)
+announcement_poll = PollController("announcement", 10, 180, 20)
+
+def guild_of_channel(channel_id: int):
+    ch = bot.get_channel(channel_id)
+    return ch.guild.id if ch is not None and getattr(ch, "guild", None) else None
+
 # Stock category mapping
 STOCK_CATEGORY_MAPPING = {
     "seed": ("seed_stock", "Seeds 🌱"),
@@ -103,404 +818,559 @@ STOCK_CATEGORY_MAPPING = {
     "cosmetic": ("cosmetic_stock", "Cosmetics 💄"),
     "event_stock": ("eventshop_stock", "Event Stock 🎉")
 }
+STOCK_API_KEYS = tuple(key for key, _ in STOCK_CATEGORY_MAPPING.values())  # the only stock keys decoded
+
+# Alert delivery: sends run concurrently, each channel retried on its own
+DELIVERY_CONCURRENCY = 20   # alert sends in flight at once
+DELIVERY_ATTEMPTS    = 3    # tries per channel before giving up
+DELIVERY_BACKOFF     = 1.0  # seconds before the first retry, doubled after each
 
-# Helper to get channel ID for stock category
-def get_channel_for_category(category_key):
-    if category_key == "seed":
-        return seed_channel_id
-    elif category_key == "gear":
-        return gear_channel_id
-    elif category_key == "egg":
-        return egg_channel_id
-    elif category_key == "cosmetic":
-        return cosmetic_channel_id
-    elif category_key == "event_stock":
-        return event_stock_channel_id
-    return None
-
-# Immediate check functions for all event types
-async def check_new_stock_for_category(category_key: str, api_key: str, channel_id: int, title: str):
-    """Check for new stock in a specific category and send if available"""
-    print(f"🔍 Checking new stock for {category_key}...")
-    async with aiohttp.ClientSession() as session:
+delivery_semaphore = asyncio.Semaphore(DELIVERY_CONCURRENCY)
+
+# Webhook tokens are credentials; webhooks.json is git-ignored and belongs next to .env
+webhook_pool = WebhookPool("GAG Notifier", on_change=lambda: webhook_writer.mark_dirty()) if WEBHOOK_DELIVERY else None
+webhook_writer = DebouncedWriter(WEBHOOK_FILE, webhook_pool.take_changes, merge=merge_keyed) if webhook_pool is not None else None
+
+def load_webhooks():
+    if webhook_pool is not None and os.path.isfile(WEBHOOK_FILE):
+        with open(WEBHOOK_FILE, "r") as f:
+            webhook_pool.load_dict(json.load(f))
+        log.info("Loaded %d delivery webhooks", len(webhook_pool))
+
+load_webhooks()
+
+async def send_alert(ch, embed: discord.Embed) -> int:
+    """Post an alert through the channel's webhook if it has one, else as the bot; returns the message id"""
+    webhook = webhook_pool.get(ch) if webhook_pool is not None else None
+    if webhook is not None:
         try:
-            async with session.get(STOCK_API_URL) as r:
-                if r.content_type == 'application/json':
-                    raw = await r.json()
-                    stock = raw[0] if isinstance(raw, list) else raw
-                else:
-                    text = await r.text()
-                    print(f"Stock API returned non-JSON: {text[:200]}")
-                    return
+            with discord_latency.time(op="webhook_send"):
+                msg = await webhook_pool.send(webhook, embed=embed, view=create_invite_view(),
+                                              username=bot.user.display_name, avatar_url=bot.user.display_avatar.url)
+            return msg.id
+        except discord.NotFound as e:
+            if e.code != UNKNOWN_WEBHOOK:
+                raise
+            webhook_pool.drop(ch.id)  # deleted in the channel settings; a new one is made next time
+    async with delivery_semaphore:
+        with discord_latency.time(op="send"):
+            msg = await ch.send(embed=embed, view=create_invite_view())
+    return msg.id
+
+async def deliver_to_channel(channel_id: int, embed: discord.Embed):
+    """Send an alert to one channel; returns the message id or None"""
+    ch = bot.get_channel(channel_id)
+    if not ch:
+        return None
+    delay = DELIVERY_BACKOFF
+    for attempt in range(1, DELIVERY_ATTEMPTS + 1):
+        try:
+            return await send_alert(ch, embed)
+        except (discord.Forbidden, discord.NotFound) as e:
+            # Retrying won't fix missing access or a deleted channel
+            discord_failures.inc(op="send")
+            log.warning("Can't send to channel %s: %s", channel_id, e)
+            return None
         except Exception as e:
-            print(f"Stock API Error in immediate check: {e}")
-            return
+            discord_failures.inc(op="send")
+            if attempt == DELIVERY_ATTEMPTS:
+                log.error("Giving up on channel %s after %d attempts: %s", channel_id, attempt, e)
+                return None
+            log.warning("Send to channel %s failed (attempt %d), retrying in %.0fs: %s", channel_id, attempt, delay, e)
+            await asyncio.sleep(delay + random.uniform(0, delay / 2))
+            delay *= 2
 
-    items = stock.get(api_key, [])
-    if not items:
-        return
+# Send one alert to every subscribed channel
+async def send_to_channels(channel_ids, embed: discord.Embed) -> dict:
+    """Returns {channel_id: message_id} for the channels that received the alert"""
+    channel_ids = list(channel_ids)
+    results = await asyncio.gather(*(deliver_to_channel(c, embed) for c in channel_ids))
+    return {c: m for c, m in zip(channel_ids, results) if m is not None}
 
-    # Get timestamps
-    start_ts = max(i.get("start_date_unix", 0) for i in items)
-    end_ts = max(i.get("end_date_unix", 0) for i in items)
+# Item watch alerts: matched in the poll cycle, delivered in batches off it
+WATCH_BATCH_DELAY = 2.0  # seconds to gather matches from rotations that change together
 
-    # Check if this is new stock
-    async with state_lock:
-        if start_ts <= last_state.get(category_key, 0):
-            print(f"⏩ Skipping {category_key} - no new stock")
-            return  # Not new
-        last_state[category_key] = start_ts  # Reserve this timestamp
+class WatchNotifier:
+    """Batches item-watch matches into one DM per user and one ping per channel.
 
-    # Try to send new stock
-    try:
-        ch = bot.get_channel(channel_id)
-        if ch:
-            embed = create_stock_embed(items, title, start_ts, end_ts)
-            msg = await ch.send(embed=embed, view=create_invite_view())
-            print(f"✅ Sent new {category_key} stock to channel {channel_id}")
-            
-            # Update active events
-            active_events["stock"][category_key] = {
-                "message_id": msg.id,
-                "channel_id": channel_id,
-                "start_ts": start_ts,
-                "end_ts": end_ts,
-                "items": items,
-                "title": title
-            }
-            save_last_state()  # Persist state
-    except Exception as e:
-        print(f"Error sending new stock for {category_key}: {e}")
+    `queue` only does the index lookups, so the poll cycle never waits on
+    Discord; alerts go out from a background task WATCH_BATCH_DELAY later,
+    which also folds seed, gear and egg rotations into a single message.
+    """
 
-async def process_weather_event(w: dict, is_restart: bool = False):
-    """Process a single weather event (new or existing)"""
-    try:
-        weather_id = w.get("weather_id")
-        if not weather_id:
-            return False
-            
-        start_ts = w.get("start_duration_unix", 0)
-        active = w.get("active", False)
-        
-        # Skip if not active
-        if not active:
-            return False
-            
-        # Calculate end time
-        duration = w.get("duration", 0)
-        end_ts = w.get("end_duration_unix")
-        if end_ts is None and start_ts and duration:
-            end_ts = start_ts + duration
-            
-        # Skip if event has ended
-        if end_ts and end_ts < datetime.now(timezone.utc).timestamp():
-            return False
-            
-        # Check if we've processed this specific occurrence
-        async with state_lock:
-            # Get stored start time for this weather ID
-            stored_start = last_state["weather"].get(weather_id, 0)
-            
-            # If this is a different occurrence (new start time)
-            if start_ts != stored_start:
-                # Send weather embed
-                embed = create_weather_embed(w)
-                ch = bot.get_channel(weather_channel_id)
-                if ch:
-                    msg = await ch.send(embed=embed, view=create_invite_view())
-                    weather_name = w.get("weather_name", "Unknown Weather")
-                    print(f"✅ Sent {'RESTART ' if is_restart else ''}weather event: {weather_name} (ID: {weather_id}) to channel {weather_channel_id}")
-                    
-                    # Track for updates
-                    active_events["weather"][weather_id] = {
-                        "message_id": msg.id,
-                        "channel_id": weather_channel_id,
-                        "weather": w
-                    }
-                    
-                    # Update state with new start time
-                    last_state["weather"][weather_id] = start_ts
-                    return True
-        return False
-    except Exception as e:
-        print(f"⚠️ Error processing weather item: {e}")
+    def __init__(self, delay: float = WATCH_BATCH_DELAY):
+        self.delay = delay
+        self._pending = {}  # target -> {item_id: (category, item)}
+        self._timer = None
+
+    def queue(self, category: str, items: list, end_ts: float) -> int:
+        """Match a new rotation against the watches; returns how many targets matched"""
+        by_id = {i.get("item_id") or item_key(i.get("display_name", "")): i for i in items}
+        matched = watches.match(by_id)
+        for target, item_ids in matched.items():
+            bucket = self._pending.setdefault(target, {})
+            for item_id in item_ids:
+                bucket[item_id] = (category, by_id[item_id], end_ts)
+        if matched and (self._timer is None or self._timer.done()):
+            self._timer = asyncio.create_task(self._flush_later())
+        return len(matched)
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.delay)
+        await self.flush()
+
+    async def flush(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        jobs = []
+        roles_by_channel = {}
+        for target, items in pending.items():
+            if target[0] == "user":
+                jobs.append(self._send_dm(target[1], list(items.values())))
+            else:
+                roles_by_channel.setdefault(target[1], {})[target[2]] = items
+        for channel_id, roles in roles_by_channel.items():
+            jobs.append(self._send_ping(channel_id, roles))
+        sent = await asyncio.gather(*jobs)
+        log.info("Sent %d/%d item watch alerts", sum(sent), len(jobs))
+
+    async def _send_dm(self, user_id: int, items: list) -> bool:
+        try:
+            async with delivery_semaphore:
+                # Without the members intent most watchers aren't cached, so the fetch is bounded too
+                user = bot.get_user(user_id) or await bot.fetch_user(user_id)
+                with discord_latency.time(op="dm"):
+                    await user.send(embed=create_watch_embed(items))
+            return True
+        except discord.Forbidden:
+            discord_failures.inc(op="dm")
+            log.info("User %s doesn't accept DMs, skipping watch alert", user_id)
+        except Exception as e:
+            discord_failures.inc(op="dm")
+            log.warning("Failed to DM watch alert to user %s: %s", user_id, e)
         return False
 
-async def check_new_weather(is_restart: bool = False):
-    """Check for weather events, with option to handle restart cases"""
-    print("\n🌡️ Checking for weather events...")
-    async with aiohttp.ClientSession() as session:
+    async def _send_ping(self, channel_id: int, roles: dict) -> bool:
+        # The poller also pings channels in guilds another process's shards serve
+        ch = bot.get_channel(channel_id) or (broker and bot.get_partial_messageable(channel_id))
+        if not ch:
+            return False
+        items = {}
+        for role_items in roles.values():
+            items.update(role_items)
         try:
-            async with session.get(WEATHER_API_URL) as r:
-                if r.status == 200 and r.content_type == 'application/json':
-                    data = await r.json()
-                    # Correctly parse the weather array from the API response
-                    wlist = data.get("weather", [])
-                    print(f"🌤️ Received {len(wlist)} weather events from API")
-                else:
-                    text = await r.text()
-                    print(f"⚠️ Weather API returned non-JSON: {text[:200]}")
-                    return
+            async with delivery_semaphore:
+                with discord_latency.time(op="ping"):
+                    await ch.send(
+                        content=" ".join(f"<@&{role_id}>" for role_id in roles),
+                        embed=create_watch_embed(list(items.values())),
+                        allowed_mentions=discord.AllowedMentions(
+                            everyone=False, users=False, roles=[discord.Object(r) for r in roles]
+                        )
+                    )
+            return True
         except Exception as e:
-            print(f"⚠️ Weather API Error: {e}")
-            return
-    
-    new_events_count = 0
-    for w in wlist:
-        if not isinstance(w, dict):
+            discord_failures.inc(op="ping")
+            log.warning("Failed to ping watchers in channel %s: %s", channel_id, e)
+        return False
+
+watch_notifier = WatchNotifier()
+
+# Every stock item seen so far, for /watch autocomplete
+watch_names = {}  # item_id -> display name
+watch_search = None
+
+def remember_items(pairs):
+    """Add (item_id, display_name) pairs to the watchable items"""
+    global watch_search
+    for item_id, name in pairs:
+        if item_id not in watch_names:
+            watch_names[item_id] = name
+            watch_search = None  # rebuilt on the next autocomplete
+
+def watch_name_index() -> NameIndex:
+    global watch_search
+    if watch_search is None:
+        watch_search = NameIndex(sorted((name, item_id) for item_id, name in watch_names.items()))
+    return watch_search
+
+# --- Event fan-out ---
+# The poller detects new events and publishes them; every process delivers
+# them to the subscribed channels in its own guilds. Without a broker the
+# one process does both and publishing is a direct call.
+broker = EventBroker(BROKER_PATH) if BROKER_PATH else None
+polling = False  # True in the process that polls the upstream APIs
+
+def wants_polling(category: str) -> bool:
+    """Whether a feed may have subscribers; other processes' subscriptions aren't visible here"""
+    return broker is not None or bool(registry.channels_for(category))
+
+async def publish_event(event: dict):
+    if broker is None:
+        await deliver_event(event)
+        return
+    # Persist dedup state first so a poller elected after a crash doesn't publish this again
+    save_last_state()
+    await state_writer.flush()
+    broker.publish(event)
+
+async def deliver_event(event: dict):
+    """Post an event to this process's subscribers and track it for countdown edits.
+
+    Events already tracked here (broker replays, a re-elected poller) or
+    already over are skipped, so nothing is posted twice.
+    """
+    end_ts = event.get("end_ts")
+    if end_ts and end_ts <= time.time():
+        return
+    if event["kind"] == "stock":
+        await deliver_stock(event)
+    elif event["kind"] == "weather":
+        await deliver_weather(event)
+    elif event["kind"] == "announcements":
+        await deliver_announcement(event)
+
+async def deliver_stock(event: dict):
+    category_key, start_ts, end_ts = event["key"], event["start_ts"], event["end_ts"]
+    tracked = active_events["stock"].get(category_key)
+    if tracked and start_ts <= tracked.record.start_ts:
+        return
+    items = event["items"]
+    if category_key in WATCH_CATEGORIES:
+        remember_items((i.get("item_id") or item_key(i.get("display_name", "")), i.get("display_name", ""))
+                       for i in items)
+
+    record = stock_record(category_key, start_ts, end_ts, items)
+    clock = record.template.clock(time.time())
+    embed = record.template.render(clock)
+    if tracked:
+        # Rollover usually beats the expiry sweep; the old rotation's messages are done
+        forget_messages(tracked)
+    # Track before sending so a replay of this rotation is skipped while it goes out
+    tracked = active_events["stock"][category_key] = TrackedEvent(record, clock)
+    if registry.channels_for(category_key):
+        messages = await send_to_channels(registry.channels_for(category_key), embed)
+        tracked.add_messages(messages, clock)
+        log.info("Sent new %s stock to %d channels", category_key, len(messages),
+                 extra={"category": category_key, "start_ts": start_ts})
+        event_store.record_delivery("stock", category_key, end_ts, messages)
+
+async def deliver_weather(event: dict):
+    weather_id, w, end_ts = event["key"], event["weather"], event["end_ts"]
+    tracked = active_events["weather"].get(weather_id)
+    if tracked and tracked.record.start_ts == w.get("start_duration_unix", 0):
+        return
+
+    record = weather_record(weather_id, w)
+    clock = record.template.clock(time.time())
+    embed = record.template.render(clock)
+    if tracked:
+        forget_messages(tracked)
+    tracked = active_events["weather"][weather_id] = TrackedEvent(record, clock)
+    messages = await send_to_channels(registry.channels_for("weather"), embed)
+    tracked.add_messages(messages, clock)
+    log.info("Sent weather event %s to %d channels", w.get("weather_name", "Unknown Weather"), len(messages),
+             extra={"weather_id": weather_id})
+    event_store.record_delivery("weather", weather_id, end_ts, messages)
+
+async def deliver_announcement(event: dict):
+    ts, end_ts, content = event["key"], event["end_ts"], event["content"]
+    if ts in active_events["announcements"]:
+        return
+    # Announcements without an end are kept live only until a newer one arrives
+    for key, previous in list(active_events["announcements"].items()):
+        if previous.record.end_ts is None and key < ts:
+            del active_events["announcements"][key]
+            forget_messages(previous)
+
+    record = announcement_record(ts, end_ts, content)
+    clock = record.template.clock(time.time())
+    embed = record.template.render(clock)
+    tracked = active_events["announcements"][ts] = TrackedEvent(record, clock)
+    if registry.channels_for("announcement"):
+        messages = await send_to_channels(registry.channels_for("announcement"), embed)
+        tracked.add_messages(messages, clock)
+        log.info("Sent new announcement to %d channels", len(messages), extra={"ts": ts})
+        event_store.record_delivery("announcements", ts, end_ts, messages)
+
+# --- Feed ingestion ---
+# Every poll goes through `ingest`: the feed snapshot fetches and decodes,
+# the differs below turn a response into the events not seen before, and the
+# consumers at the end of the section act on them.
+def diff_stock(stock: StockPayload) -> list:
+    """New rotations and a new announcement in a stock response"""
+    events = [e for e in (new_rotation(stock, c) for c in STOCK_CATEGORY_MAPPING) if e]
+    announcement = new_announcement(stock)
+    if announcement:
+        events.append(announcement)
+    if events:
+        save_last_state()
+    return events
+
+def new_rotation(stock: StockPayload, category_key: str):
+    rotation = stock.rotations.get(STOCK_CATEGORY_MAPPING[category_key][0])
+    if rotation is None:
+        return None
+    start_ts, end_ts = rotation.start_ts, rotation.end_ts
+    tracked = active_events["stock"].get(category_key)
+    if start_ts <= last_state.get(category_key, 0) or (tracked and start_ts <= tracked.record.start_ts):
+        return None
+    last_state[category_key] = start_ts  # Reserve this timestamp
+    stock_poll.observe(start_ts)
+    rollover_scheduler.schedule(category_key, end_ts)
+    return {
+        "kind": "stock",
+        "key": category_key,
+        "start_ts": start_ts,
+        "end_ts": end_ts,
+        "items": [i.to_dict() for i in rotation.items]
+    }
+
+def new_announcement(stock: StockPayload):
+    note = stock.notification
+    if note is None or note.ts <= last_state.get("announcement", 0) or note.ts in active_events["announcements"]:
+        return None
+    last_state["announcement"] = note.ts
+    announcement_poll.observe(note.ts)
+    return {"kind": "announcements", "key": note.ts, "end_ts": note.end_ts, "content": note.message}
+
+def diff_weather(data: WeatherPayload) -> list:
+    """Active weather events whose current occurrence hasn't been seen"""
+    now = datetime.now(timezone.utc).timestamp()
+    events = []
+    for w in data.events:
+        if not w.active or (w.end_ts and w.end_ts < now):
             continue
-            
-        if await process_weather_event(w, is_restart):
-            new_events_count += 1
-    
-    if new_events_count > 0:
+        # Same occurrence as last time, or one we're already tracking
+        tracked = active_events["weather"].get(w.weather_id)
+        if w.start_ts == last_state["weather"].get(w.weather_id, 0) or (tracked and w.start_ts == tracked.record.start_ts):
+            continue
+        last_state["weather"][w.weather_id] = w.start_ts
+        weather_poll.observe(w.start_ts)
+        events.append({"kind": "weather", "key": w.weather_id, "weather": w.to_dict(), "end_ts": w.end_ts})
+    if events:
         save_last_state()
-        print(f"🌧️ Processed {new_events_count} weather events")
+    return events
+
+async def record_history(event: dict):
+    if event["kind"] == "stock":
+        event_store.record_stock(event["key"], event["start_ts"], event["end_ts"], event["items"])
+    elif event["kind"] == "weather":
+        event_store.record_weather(event["key"], event["weather"]["start_duration_unix"], event["end_ts"],
+                                   event["weather"])
     else:
-        print("🌤️ No new weather events found")
+        event_store.record_announcement(event["key"], event["end_ts"], event["content"])
 
-async def check_new_announcements():
-    """Immediately check for new Jandel announcements"""
-    print("\n📝 Checking for new announcements...")
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(STOCK_API_URL) as r:
-                if r.status == 200 and r.content_type == 'application/json':
-                    raw = await r.json()
-                    stock = raw[0] if isinstance(raw, list) else raw
-                    print(f"📢 Received stock API response")
-                else:
-                    text = await r.text()
-                    print(f"⚠️ Stock API returned non-JJSON: {text[:200]}")
-                    return
-        except Exception as e:
-            print(f"⚠️ Stock API Error: {e}")
+async def match_watches(event: dict):
+    if event["kind"] == "stock" and event["key"] in WATCH_CATEGORIES:
+        watch_notifier.queue(event["key"], event["items"], event["end_ts"])
+
+async def count_event(event: dict):
+    events_emitted.inc(kind=event["kind"])
+
+ingest = EventPipeline()
+ingest.add_feed(stock_feed, diff_stock)
+ingest.add_feed(weather_feed, diff_weather)
+ingest.subscribe("history", record_history)
+ingest.subscribe("delivery", publish_event)
+ingest.subscribe("watches", match_watches)
+ingest.subscribe("metrics", count_event)
+
+# --- Stock rollover scheduler ---
+ROLLOVER_JITTER      = 0.5  # random delay after end_ts so we don't hit the API the instant it rolls
+ROLLOVER_RETRY_DELAY = 1.0  # seconds between re-checks while the new rotation isn't out yet
+ROLLOVER_MAX_WAIT    = 60   # stop retrying after this long and leave it to fetch_updates
+
+class RolloverScheduler:
+    """Sleeps until the next category's end_ts, then re-checks that category.
+
+    Deadlines live in a heap keyed by due time; rescheduling a category just
+    pushes a new entry and the stale one is dropped when it surfaces.
+    """
+
+    def __init__(self):
+        self._heap = []       # (due, category, end_ts)
+        self._deadlines = {}  # category -> end_ts it's currently scheduled for
+        self._tasks = set()
+        self._wakeup = asyncio.Event()
+        self._runner = None
+
+    def start(self):
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._runner is not None:
+            self._runner.cancel()
+            self._runner = None
+        for task in self._tasks:
+            task.cancel()
+
+    def schedule(self, category: str, end_ts: float):
+        if self._deadlines.get(category) == end_ts:
             return
+        self._deadlines[category] = end_ts
+        heapq.heappush(self._heap, (end_ts + random.uniform(0, ROLLOVER_JITTER), category, end_ts))
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            # Discard entries superseded by a later schedule() for the same category
+            while self._heap and self._deadlines.get(self._heap[0][1]) != self._heap[0][2]:
+                heapq.heappop(self._heap)
 
-    raw_note = stock.get("notification", [])
-    note = raw_note[0] if isinstance(raw_note, list) and raw_note else None
-    if note and isinstance(note, dict):
-        msg_content = note.get("message")
-        ts = note.get("timestamp", 0)
-        
-        async with state_lock:
-            if not msg_content or ts <= last_state.get("announcement", 0):
-                print("⏩ No new announcements found")
+            if not self._heap:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                # Wake early if an earlier deadline gets scheduled meanwhile
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            _, category, end_ts = heapq.heappop(self._heap)
+            del self._deadlines[category]
+            task = asyncio.create_task(self._rollover(category, end_ts))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _rollover(self, category: str, end_ts: float):
+        give_up_at = time.monotonic() + ROLLOVER_MAX_WAIT
+        while True:
+            # A fresh snapshot, still shared by categories rolling over together
+            await ingest.poll(stock_feed, max_age=ROLLOVER_RETRY_DELAY / 2)
+            if category in self._deadlines or time.monotonic() >= give_up_at:
+                # The new rotation was found (diffing reschedules it), or upstream is late
+                # and the 5-minute poll will catch it
                 return
-                
-        # Send new announcement
-        embed = discord.Embed(
-            title="📝 Jandel Announcement",
-            description=msg_content,
-            color=discord.Color.orange()
-        )
-        embed.add_field(name="🕒 Posted", value=f"{time_ago(ts)}", inline=False)
-        
-        end_ts = note.get("end_timestamp")
-        if end_ts:
-            now = datetime.now(timezone.utc).timestamp()
-            if end_ts > now:
-                remaining = end_ts - now
-                mins = int(remaining // 60)
-                secs = int(remaining % 60)
-                embed.add_field(name="⏱️ Ends In", value=f"{mins}m {secs}s", inline=True)
-        
-        ch = bot.get_channel(announcement_channel_id)
-        if ch:
-            msg = await ch.send(embed=embed, view=create_invite_view())
-            print(f"✅ Sent NEW announcement to channel {announcement_channel_id}")
-            
-            # Track for updates
-            active_events["announcements"][ts] = {
-                "message_id": msg.id,
-                "channel_id": announcement_channel_id,
-                "start_ts": ts,
-                "end_ts": end_ts,
-                "content": msg_content
-            }
-            
-        # Update state
-        async with state_lock:
-            last_state["announcement"] = ts
-        save_last_state()
-    else:
-        print("⏩ No announcements found in API response")
-
-# Full Data definitions (fruits, mutations, variants)
-DATA = {
-    "fruits": [
-        {"item_id":"carrot","display_name":"Carrot","baseValue":20,"weightDivisor":0.275},
-        {"item_id":"strawberry","display_name":"Strawberry","baseValue":15,"weightDivisor":0.3},
-        {"item_id":"blueberry","display_name":"Blueberry","baseValue":20,"weightDivisor":0.2},
-        {"item_id":"orange_tulip","display_name":"Orange Tulip","baseValue":850,"weightDivisor":0.05},
-        {"item_id":"tomato","display_name":"Tomato","baseValue":30,"weightDivisor":0.5},
-        {"item_id":"corn","display_name":"Corn","baseValue":40,"weightDivisor":2},
-        {"item_id":"daffodil","display_name":"Daffodil","baseValue":1000,"weightDivisor":0.2},
-        {"item_id":"watermelon","display_name":"Watermelon","baseValue":3000,"weightDivisor":7},
-        {"item_id":"pumpkin","display_name":"Pumpkin","baseValue":3400,"weightDivisor":8},
-        {"item_id":"apple","display_name":"Apple","baseValue":275,"weightDivisor":3},
-        {"item_id":"bamboo","display_name":"Bamboo","baseValue":4000,"weightDivisor":4},
-        {"item_id":"coconut","display_name":"Coconut","baseValue":400,"weightDivisor":14},
-        {"item_id":"cactus","display_name":"Cactus","baseValue":3400,"weightDivisor":7},
-        {"item_id":"dragon_fruit","display_name":"Dragon Fruit","baseValue":4750,"weightDivisor":12},
-        {"item_id":"mango","display_name":"Mango","baseValue":6500,"weightDivisor":15},
-        {"item_id":"grape","display_name":"Grape","baseValue":7850,"weightDivisor":3},
-        {"item_id":"mushroom","display_name":"Mushroom","baseValue":151000,"weightDivisor":25},
-        {"item_id":"pepper","display_name":"Pepper","baseValue":8000,"weightDivisor":5},
-        {"item_id":"cacao","display_name":"Cacao","baseValue":12000,"weightDivisor":8},
-        {"item_id":"beanstalk","display_name":"Beanstalk","baseValue":28000,"weightDivisor":10},
-        {"item_id":"ember_lily","display_name":"Ember Lily","baseValue":66666,"weightDivisor":12},
-        {"item_id":"sugar_apple","display_name":"Sugar Apple","baseValue":48000,"weightDivisor":9},
-        {"item_id":"pineapple","display_name":"Pineapple","baseValue":2000,"weightDivisor":3},
-        {"item_id":"cauliflower","display_name":"Cauliflower","baseValue":40,"weightDivisor":5},
-        {"item_id":"green_apple","display_name":"Green Apple","baseValue":300,"weightDivisor":3},
-        {"item_id":"banana","display_name":"Banana","baseValue":2000,"weightDivisor":1.5},
-        {"item_id":"avocado","display_name":"Avocado","baseValue":350,"weightDivisor":6.5},
-        {"item_id":"kiwi","display_name":"Kiwi","baseValue":2750,"weightDivisor":5},
-        {"item_id":"bell_pepper","display_name":"Bell Pepper","baseValue":5500,"weightDivisor":8},
-        {"item_id":"prickly_pear","display_name":"Prickly Pear","baseValue":7000,"weightDivisor":7},
-        {"item_id":"feijoa","display_name":"Feijoa","baseValue":13000,"weightDivisor":10},
-        {"item_id":"loquat","display_name":"Loquat","baseValue":8000,"weightDivisor":6.5},
-        {"item_id":"wild_carrot","display_name":"Wild Carrot","baseValue":25000,"weightDivisor":0.3},
-        {"item_id":"pear","display_name":"Pear","baseValue":20000,"weightDivisor":3},
-        {"item_id":"cantaloupe","display_name":"Cantaloupe","baseValue":34000,"weightDivisor":5.5},
-        {"item_id":"parasol_flower","display_name":"Parasol Flower","baseValue":200000,"weightDivisor":6},
-        {"item_id":"rosy_delight","display_name":"Rosy Delight","baseValue":69000,"weightDivisor":10},
-        {"item_id":"elephant_ears","display_name":"Elephant Ears","baseValue":77000,"weightDivisor":18},
-        {"item_id":"chocolate_carrot","display_name":"Chocolate Carrot","baseValue":11000,"weightDivisor":0.275},
-        {"item_id":"red_lollipop","display_name":"Red Lollipop","baseValue":50000,"weightDivisor":4},
-        {"item_id":"blue_lollipop","display_name":"Blue Lollipop","baseValue":50000,"weightDivisor":1},
-        {"item_id":"candy_sunflower","display_name":"Candy Sunflower","baseValue":80000,"weightDivisor":1.5},
-        {"item_id":"easter_egg","display_name":"Easter Egg","baseValue":2500,"weightDivisor":3},
-        {"item_id":"candy_blossom","display_name":"Candy Blossom","baseValue":100000,"weightDivisor":3},
-        {"item_id":"peach","display_name":"Peach","baseValue":300,"weightDivisor":2},
-        {"item_id":"raspberry","display_name":"Raspberry","baseValue":100,"weightDivisor":0.75},
-        {"item_id":"papaya","display_name":"Papaya","baseValue":1000,"weightDivisor":3},
-        {"item_id":"banana","display_name":"Banana","baseValue":1750,"weightDivisor":1.5},
-        {"item_id":"passionfruit","display_name":"Passionfruit","baseValue":3550,"weightDivisor":3},
-        {"item_id":"soul_fruit","display_name":"Soul Fruit","baseValue":7750,"weightDivisor":25},
-        {"item_id":"cursed_fruit","display_name":"Cursed Fruit","baseValue":25750,"weightDivisor":30},
-        {"item_id":"mega_mushroom","display_name":"Mega Mushroom","baseValue":500,"weightDivisor":70},
-        {"item_id":"cherry_blossom","display_name":"Cherry Blossom","baseValue":500,"weightDivisor":3},
-        {"item_id":"purple_cabbage","display_name":"Purple Cabbage","baseValue":500,"weightDivisor":5},
-        {"item_id":"lemon","display_name":"Lemon","baseValue":350,"weightDivisor":1},
-        {"item_id":"pink_tulip","display_name":"Pink Tulip","baseValue":850,"weightDivisor":0.05},
-        {"item_id":"cranberry","display_name":"Cranberry","baseValue":3500,"weightDivisor":1},
-        {"item_id":"durian","display_name":"Durian","baseValue":7500,"weightDivisor":8},
-        {"item_id":"eggplant","display_name":"Eggplant","baseValue":12000,"weightDivisor":5},
-        {"item_id":"lotus","display_name":"Lotus","baseValue":35000,"weightDivisor":20},
-        {"item_id":"venus_fly_trap","display_name":"Venus Fly Trap","baseValue":85000,"weightDivisor":10},
-        {"item_id":"nightshade","display_name":"Nightshade","baseValue":3500,"weightDivisor":0.5},
-        {"item_id":"glowshroom","display_name":"Glowshroom","baseValue":300,"weightDivisor":0.75},
-        {"item_id":"mint","display_name":"Mint","baseValue":5250,"weightDivisor":1},
-        {"item_id":"moonflower","display_name":"Moonflower","baseValue":9500,"weightDivisor":2},
-        {"item_id":"starfruit","display_name":"Starfruit","baseValue":15000,"weightDivisor":3},
-        {"item_id":"moonglow","display_name":"Moonglow","baseValue":25000,"weightDivisor":7},
-        {"item_id":"moon_blossom","display_name":"Moon Blossom","baseValue":66666,"weightDivisor":3},
-        {"item_id":"crimson_vine","display_name":"Crimson Vine","baseValue":1250,"weightDivisor":1},
-        {"item_id":"moon_melon","display_name":"Moon Melon","baseValue":18000,"weightDivisor":8},
-        {"item_id":"blood_banana","display_name":"Blood Banana","baseValue":6000,"weightDivisor":1.5},
-        {"item_id":"celestiberry","display_name":"Celestiberry","baseValue":10000,"weightDivisor":2},
-        {"item_id":"moon_mango","display_name":"Moon Mango","baseValue":50000,"weightDivisor":15},
-        {"item_id":"rose","display_name":"Rose","baseValue":5000,"weightDivisor":1},
-        {"item_id":"foxglove","display_name":"Foxglove","baseValue":20000,"weightDivisor":2},
-        {"item_id":"lilac","display_name":"Lilac","baseValue":35000,"weightDivisor":3},
-        {"item_id":"pink_lily","display_name":"Pink Lily","baseValue":65000,"weightDivisor":6},
-        {"item_id":"purple_dahlia","display_name":"Purple Dahlia","baseValue":75000,"weightDivisor":12},
-        {"item_id":"sunflower","display_name":"Sunflower","baseValue":160000,"weightDivisor":16.5},
-        {"item_id":"lavender","display_name":"Lavender","baseValue":25000,"weightDivisor":0.275},
-        {"item_id":"nectarshade","display_name":"Nectarshade","baseValue":50000,"weightDivisor":0.8},
-        {"item_id":"nectarine","display_name":"Nectarine","baseValue":48000,"weightDivisor":3},
-        {"item_id":"hive_fruit","display_name":"Hive Fruit","baseValue":62000,"weightDivisor":8},
-        {"item_id":"manuka_flower","display_name":"Manuka Flower","baseValue":25000,"weightDivisor":0.3},
-        {"item_id":"dandelion","display_name":"Dandelion","baseValue":50000,"weightDivisor":4},
-        {"item_id":"lumira","display_name":"Lumira","baseValue":85000,"weightDivisor":6},
-        {"item_id":"honeysuckle","display_name":"Honeysuckle","baseValue":100000,"weightDivisor":12},
-        {"item_id":"crocus","display_name":"Crocus","baseValue":30000,"weightDivisor":0.275},
-        {"item_id":"succulent","display_name":"Succulent","baseValue":25000,"weightDivisor":5},
-        {"item_id":"violet_corn","display_name":"Violet Corn","baseValue":50000,"weightDivisor":3},
-        {"item_id":"bendboo","display_name":"Bendboo","baseValue":155000,"weightDivisor":18},
-        {"item_id":"cocovine","display_name":"Cocovine","baseValue":66666,"weightDivisor":14},
-        {"item_id":"dragon_pepper","display_name":"Dragon Pepper","baseValue":88888,"weightDivisor":6},
-        {"item_id":"bee_balm","display_name":"Bee Balm","baseValue":18000,"weightDivisor":1},
-        {"item_id":"nectar_thorn","display_name":"Nectar Thorn","baseValue":44444,"weightDivisor":7},
-        {"item_id":"suncoil","display_name":"Suncoil","baseValue":80000,"weightDivisor":10},
-        {"item_id":"noble_flower","display_name":"Noble Flower","baseValue":20000,"weightDivisor":5},
-        {"item_id":"traveler's_fruit","display_name":"Traveler's Fruit","baseValue":20000,"weightDivisor":2},
-        {"item_id":"ice_cream_bean","display_name":"Ice Cream Bean","baseValue":4500,"weightDivisor":4},
-        {"item_id":"lime","display_name":"Lime","baseValue":1000,"weightDivisor":1}
-    ],
-    "mutations": [
-        {"mutation_id":"windstruck","display_name":"Windstruck","multiplier":5},
-        {"mutation_id":"twisted","display_name":"Twisted","multiplier":5},
-        {"mutation_id":"voidtouched","display_name":"Voidtouched","multiplier":135},
-        {"mutation_id":"moonlit","display_name":"Moonlit","multiplier":2},
-        {"mutation_id":"pollinated","display_name":"Pollinated","multiplier":3},
-        {"mutation_id":"honeyglazed","display_name":"HoneyGlazed","multiplier":5},
-        {"mutation_id":"plasma","display_name":"Plasma","multiplier":5},
-        {"mutation_id":"molten","display_name":"Molten","multiplier":25},
-        {"mutation_id":"frozen","display_name":"Frozen","multiplier":10},
-        {"mutation_id":"celestial","display_name":"Celestial","multiplier":120},
-        {"mutation_id":"burnt","display_name":"Burnt","multiplier":4},
-        {"mutation_id":"dawnbound","display_name":"Dawnbound","multiplier":150},
-        {"mutation_id":"shocked","display_name":"Shocked","multiplier":100},
-        {"mutation_id":"bloodlit","display_name":"Bloodlit","multiplier":4},
-        {"mutation_id":"chilled","display_name":"Chilled","multiplier":2},
-        {"mutation_id":"choc","display_name":"Choc","multiplier":2},
-        {"mutation_id":"zombified","display_name":"Zombified","multiplier":25},
-        {"mutation_id":"heavenly","display_name":"Heavenly","multiplier":5},
-        {"mutation_id":"cooked","display_name":"Cooked","multiplier":10},
-        {"mutation_id":"disco","display_name":"Disco","multiplier":125},
-        {"mutation_id":"wet","display_name":"Wet","multiplier":3},
-        {"mutation_id":"sweet","display_name":"Sweet","multiplier":2},
-        {"mutation_id":"swampy","display_name":"Swampy","multiplier":1},
-        {"mutation_id":"ghostly","display_name":"Ghostly","multiplier":90},
-        {"mutation_id":"meteoric","display_name":"Meteoric","multiplier":125}
-    ],
-    "variants": [
-        {"variant_id":"normal","display_name":"Normal","multiplier":1},
-        {"variant_id":"gold","display_name":"Gold","multiplier":20},
-        {"variant_id":"rainbow","display_name":"Rainbow","multiplier":50}
-    ]
-}
-# Lookup tables
-FRUIT_DATA = DATA["fruits"]
-MUTATIONS   = {m["mutation_id"]: m["multiplier"] for m in DATA["mutations"]}
-VARIANTS    = {v["variant_id"]: v["multiplier"] for v in DATA["variants"]}
+            if stock_feed.stale:
+                # Upstream is failing; the breaker paces retries, not this loop
+                log.info("Stock API unavailable, %s rollover left to the regular poll", category)
+                return
+            await asyncio.sleep(ROLLOVER_RETRY_DELAY)
+
+rollover_scheduler = RolloverScheduler()
+
+# Fruits, mutations and variants, reloaded whenever catalog.json changes
+CATALOG_POLL = 10  # seconds between catalog file checks
+
+catalog_signature = file_signature(CATALOG_FILE)
+catalog = load_catalog(CATALOG_FILE)
+
+@tasks.loop(seconds=CATALOG_POLL)
+async def watch_catalog():
+    global catalog, catalog_signature
+    try:
+        signature = file_signature(CATALOG_FILE)
+        if signature == catalog_signature:
+            return
+        # Parse and index off the loop, then swap the reference in one step
+        new_catalog = await asyncio.to_thread(load_catalog, CATALOG_FILE)
+    except Exception as e:
+        log.error("Catalog reload failed, keeping the current one: %s", e)
+        return
+    catalog, catalog_signature = new_catalog, signature
+    log.info("Catalog reloaded: %d fruits, %d mutations", len(catalog.fruits), len(catalog.mutations))
+
+@tasks.loop(seconds=CATALOG_POLL)
+async def watch_shared_watches():
+    """Pick up watches added through other processes (broker mode only)"""
+    try:
+        if reload_watches():
+            log.info("Watches reloaded: %d", len(watches))
+    except Exception as e:
+        log.error("Watch reload failed, keeping the current ones: %s", e)
+
+async def start_polling():
+    """Run the upstream polling loops in this process"""
+    global polling
+    polling = True
+    ingest.start()
+    # Check for active weather immediately on startup
+    if wants_polling("weather"):
+        await ingest.poll(weather_feed)
+    rollover_scheduler.start()
+    fetch_updates.start()
+    frequent_checks.start()
+
+async def elect_poller():
+    """Become the poller if no other process holds the broker lock"""
+    if polling or not broker.try_lock():
+        return
+    await broker.start()
+    log.info("Elected as poller, publishing events on %s", BROKER_PATH)
+    load_last_state()  # the previous poller may have moved it on since startup
+    await start_polling()
+
+broker_client = BrokerClient(BROKER_PATH, deliver_event, before_connect=elect_poller) if broker else None
+background_started = False
 
 @bot.event
 async def on_ready():
-    print(f"\n✅ Logged in as {bot.user}")
+    global background_started
+    log.info("Logged in as %s (%d shards)", bot.user, len(bot.shards))
+    if background_started:
+        return  # a gateway reconnect; everything below is already running
+    background_started = True
+    get_http_session()
     try:
         await bot.tree.sync()
-        print("🔄 Slash commands synced")
+        log.info("Slash commands synced")
     except Exception as e:
-        print(f"⚠️ Sync error: {e}")
-    
-    # Check for active weather immediately on startup
-    if weather_channel_id:
-        await check_new_weather(is_restart=True)
+        log.error("Slash command sync failed: %s", e)
     
+    # Pick up countdowns for events that were still running before a restart
+    rehydrate_active_events()
+    remember_items(event_store.stocked_items(WATCH_CATEGORIES))
+
+    # Attach channels migrated from channels.json to their guilds
+    if registry.adopt_unknown(guild_of_channel):
+        save_registry()
+
     # Start background tasks
-    fetch_updates.start()
+    edit_scheduler.start()
     update_active_events.start()
-    frequent_checks.start()
-    print("🚀 Background tasks started")
+    watch_catalog.start()
+    if broker_client is None:
+        await start_polling()
+    else:
+        watch_shared_watches.start()
+        broker_client.start()
+    log.info("Background tasks started")
+
+# Frequent checks for weather and announcements, each on its own adaptive cadence
+POLL_TICK_MIN = 5  # never wake the loop more often than this
 
-# New task for frequent checks (every 20 seconds)
 @tasks.loop(seconds=20)
 async def frequent_checks():
-    """Check for new weather and announcements every 20 seconds"""
-    print("\n⏳ Running 20-second checks...")
-    if weather_channel_id:
-        await check_new_weather()
-    if announcement_channel_id:
-        await check_new_announcements()
-    print("⏳ 20-second checks completed")
+    """Check weather and announcements whenever their poll controllers say they're due"""
+    log.debug("Running frequent checks")
+    now = time.time()
+    if weather_poll.due(now):
+        if wants_polling("weather"):
+            await ingest.poll(weather_feed)
+        weather_poll.plan()
+    if announcement_poll.due(now):
+        # Announcements come with the stock payload; any new rotations in it are picked up too
+        if wants_polling("announcement"):
+            await ingest.poll(stock_feed)
+        announcement_poll.plan()
+
+    wait = min(weather_poll.next_due, announcement_poll.next_due) - time.time()
+    frequent_checks.change_interval(seconds=max(POLL_TICK_MIN, wait))
+    log.debug("Frequent checks completed, next in %.0fs", max(POLL_TICK_MIN, wait))
 
 # Time Ago Helper (UTC based)
-def time_ago(ts: float) -> str:
-    now = datetime.now(timezone.utc).timestamp()
+def time_ago(ts: float, now: float = None) -> str:
+    if now is None:
+        now = datetime.now(timezone.utc).timestamp()
     diff = int(now - ts)
     if diff < 60:
         return f"{diff} second{'s' if diff != 1 else ''} ago"
@@ -510,204 +1380,465 @@ def time_ago(ts: float) -> str:
     if diff < 86400:
         h = diff // 3600
         return f"{h} hour{'s' if h != 1 else ''} ago"
-    d = diff // 864) else raw
-                    print("📦 Received stock API data")
-                else:
-                    text = await r.text()
-                    print(f"⚠️ Stock API returned non-JJSON: {text[:200]}")
-                    return
-        except Exception as e:
-            print(f"⚠️ Stock API Error: {e}")
+    d = diff // 86400
+    return f"{d} day{'s' if d != 1 else ''} ago"
+
+# Countdown text; seconds only matter once the event is close to ending
+def format_countdown(remaining: float) -> str:
+    mins = int(remaining // 60)
+    if remaining > 600:
+        return f"{mins}m"
+    secs = int(remaining % 60)
+    return f"{mins}m {secs}s"
+
+# Invite button view
+def create_invite_view() -> View:
+    view = View()
+    view.add_item(Button(label="Invite Bot", url=INVITE_URL))
+    return view
+
+# Event embeds. While an event is live only its "ago" and countdown fields
+# change, so everything else is rendered once per event and kept on it.
+class EmbedTemplate:
+    """The static part of an event's embed; `render` fills in the clock fields"""
+    __slots__ = ("title", "description", "color", "since_label", "start_ts", "until_label", "end_ts")
+
+    def __init__(self, title: str, description, color: discord.Color,
+                 since_label: str, start_ts, until_label: str, end_ts):
+        self.title = title
+        self.description = description
+        self.color = color
+        self.since_label = since_label
+        self.start_ts = start_ts
+        self.until_label = until_label
+        self.end_ts = end_ts
+
+    def clock(self, now: float) -> tuple:
+        """The text of the time-dependent fields; equal clocks render identical embeds"""
+        since = time_ago(self.start_ts, now) if self.start_ts else None
+        until = format_countdown(self.end_ts - now) if self.end_ts and self.end_ts > now else None
+        return since, until
+
+    def render(self, clock: tuple = None) -> discord.Embed:
+        since, until = clock or self.clock(datetime.now(timezone.utc).timestamp())
+        embed = discord.Embed(title=self.title, description=self.description, color=self.color)
+        if since is not None:
+            embed.add_field(name=self.since_label, value=since, inline=False)
+        if until is not None:
+            embed.add_field(name=self.until_label, value=until, inline=True)
+        return embed
+
+def stock_template(items: list, title: str, start_ts: float, end_ts: float) -> EmbedTemplate:
+    lines = []
+    for i in items:
+        name = i.get("display_name", i.get("item_id", "Unknown"))
+        lines.append(f"**{name}** x{i.get('quantity', 0)}")
+    return EmbedTemplate(f"🛒 {title}", "\n".join(lines) or "No items in stock", discord.Color.green(),
+                         "🕒 Restocked", start_ts, "⏱️ Next Restock", end_ts)
+
+def weather_end(w: dict):
+    """When a weather event ends; older payloads only give a duration"""
+    end_ts = w.get("end_duration_unix")
+    if end_ts is None and w.get("start_duration_unix") and w.get("duration"):
+        end_ts = w["start_duration_unix"] + w["duration"]
+    return end_ts
+
+def weather_template(w: dict) -> EmbedTemplate:
+    name = w.get("weather_name", "Unknown Weather")
+    return EmbedTemplate(f"🌦️ {name}", None, discord.Color.blue(),
+                         "🕒 Started", w.get("start_duration_unix", 0), "⏱️ Ends In", weather_end(w))
+
+def announcement_template(content: str, start_ts: float, end_ts) -> EmbedTemplate:
+    return EmbedTemplate("📝 Jandel Announcement", content, discord.Color.orange(),
+                         "🕒 Posted", start_ts, "⏱️ Ends In", end_ts)
+
+# --- Tracked events ---
+class EventRecord:
+    """One upstream event as posted: identity, timing and its embed template.
+
+    Records are interned by (kind, key, start_ts), so the live delivery, a
+    broker replay and a restore from the event store share one object, and
+    they can't be changed once made. The raw payload isn't kept; everything
+    the embeds need is already rendered into the template.
+    """
+    __slots__ = ("kind", "key", "start_ts", "end_ts", "template", "__weakref__")
+
+    def __init__(self, kind: str, key, start_ts, end_ts, template: EmbedTemplate):
+        for name, value in (("kind", kind), ("key", key), ("start_ts", start_ts),
+                            ("end_ts", end_ts), ("template", template)):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("EventRecord is immutable")
+
+_records = weakref.WeakValueDictionary()
+
+def event_record(kind: str, key, start_ts, end_ts, build_template) -> EventRecord:
+    """The interned record for an event; `build_template` only runs the first time it's seen"""
+    record = _records.get((kind, key, start_ts))
+    if record is None:
+        record = _records[(kind, key, start_ts)] = EventRecord(kind, key, start_ts, end_ts, build_template())
+    return record
+
+def stock_record(category: str, start_ts: float, end_ts: float, items: list) -> EventRecord:
+    title = STOCK_CATEGORY_MAPPING[category][1]
+    return event_record("stock", category, start_ts, end_ts, lambda: stock_template(items, title, start_ts, end_ts))
+
+def weather_record(weather_id: str, w: dict) -> EventRecord:
+    return event_record("weather", weather_id, w.get("start_duration_unix", 0), weather_end(w),
+                        lambda: weather_template(w))
+
+def announcement_record(ts: float, end_ts, content: str) -> EventRecord:
+    return event_record("announcements", ts, ts, end_ts, lambda: announcement_template(content, ts, end_ts))
+
+class TrackedMessage:
+    """One channel's copy of a tracked event and the clock it was last rendered with"""
+    __slots__ = ("channel_id", "message_id", "fingerprint")
+
+    def __init__(self, channel_id: int, message_id: int, fingerprint=None):
+        self.channel_id = channel_id
+        self.message_id = message_id
+        self.fingerprint = fingerprint
+
+class TrackedEvent:
+    """A live event and its messages, {channel_id: TrackedMessage}.
+
+    `fingerprint` is the clock every message was last rendered with, so a
+    tick that wouldn't change anything is skipped without visiting them.
+    """
+    __slots__ = ("record", "messages", "fingerprint", "next_edit")
+
+    def __init__(self, record: EventRecord, fingerprint=None):
+        self.record = record
+        self.messages = {}
+        self.fingerprint = fingerprint
+        self.next_edit = 0.0
+
+    def add_messages(self, messages: dict, fingerprint=None):
+        """Track {channel_id: message_id}, rendered with `fingerprint` (None if unknown)"""
+        for channel_id, message_id in messages.items():
+            self.messages[channel_id] = TrackedMessage(channel_id, message_id, fingerprint)
+        if fingerprint != self.fingerprint:
+            self.fingerprint = None
+
+    def invalidate(self):
+        """Make the next tick re-render every message"""
+        self.fingerprint = None
+        self.next_edit = 0.0
+        for tracked in self.messages.values():
+            tracked.fingerprint = None
+
+# Item watch alert builder
+def create_watch_embed(items: list) -> discord.Embed:
+    """`items` are (category, item, end_ts) tuples from one batch of matches"""
+    embed = discord.Embed(title="👀 Watched Items In Stock", color=discord.Color.gold())
+    lines = []
+    for category, i, end_ts in items:
+        name = i.get("display_name", i.get("item_id", "Unknown"))
+        shop = STOCK_CATEGORY_MAPPING[category][1]
+        lines.append(f"**{name}** x{i.get('quantity', 0)} in {shop}, until <t:{int(end_ts)}:t>")
+    embed.description = "\n".join(lines)
+    return embed
+
+# Messages we keep editing with live countdowns: {kind: {key: TrackedEvent}}
+active_events = {
+    "stock": {},
+    "weather": {},
+    "announcements": {}
+}
+
+def rehydrate_active_events():
+    """Restore unexpired events and their posted messages without re-posting them"""
+    stored = event_store.load_active()
+    restored = []
+
+    def restore(kind: str, key, record: EventRecord, messages: dict):
+        if key in active_events[kind]:
             return
+        if SHARD_IDS is not None:
+            # The store is shared; messages in channels this process can't see are another's to edit
+            messages = {c: m for c, m in messages.items() if bot.get_channel(c)}
+        tracked = active_events[kind][key] = TrackedEvent(record)
+        tracked.add_messages(messages)
+        restored.append(tracked)
 
-        # Unified stock categories
-        stock_categories = [
-            ("seed_stock", seed_channel_id, "Seeds 🌱", "seed"),
-            ("gear_stock", gear_channel_id, "Gear ⚙️", "gear"),
-            ("egg_stock", egg_channel_id, "Eggs 🥚", "egg"),
-            ("cosmetic_stock", cosmetic_channel_id, "Cosmetics 💄", "cosmetic"),
-            ("eventshop_stock", event_stock_channel_id, "Event Stock 🎉", "event_stock"),
-        ]
-        
-        for api_key, chan_id, title, state_key in stock_categories:
-            if not chan_id:
-                continue
-                
-            items = stock.get(api_key, [])
-            if items:
-                # Get timestamps from API response
-                start_ts = max(i.get("start_date_unix", 0) for i in items)
-                end_ts = max(i.get("end_date_unix", 0) for i in items)
-                
-                if start_ts > last_state.get(state_key, 0):
-                    embed = create_stock_embed(items, title, start_ts, end_ts)
-                    ch = bot.get_channel(chan_id)
-                    if ch:
-                        msg = await ch.send(embed=embed, view=create_invite_view())
-                        print(f"✅ Sent new {state_key} stock to channel {chan_id}")
-                        # Track for updates
-                        active_events["stock"][state_key] = {
-                            "message_id": msg.id,
-                            "channel_id": chan_id,
-                            "start_ts": start_ts,
-                            "end_ts": end_ts,
-                            "items": items,
-                            "title": title
-                        }
-                    last_state[state_key] = start_ts
-                else:
-                    print(f"⏩ No new stock for {state_key}")
-
-        # Jandel Announcement
-        raw_note = stock.get("notification", [])
-        note = raw_note[0] if isinstance(raw_note, list) and raw_note else None
-        if note and isinstance(note, dict):
-            msg_content = note.get("message")
-            ts  = note.get("timestamp", 0)
-            if msg_content and ts > last_state.get("announcement", 0):
-                embed = discord.Embed(
-                    title="📝 Jandel Announcement",
-                    description=msg_content,
-                    color=discord.Color.orange()
-                )
-                
-                # Add time information
-                embed.add_field(name="🕒 Posted", value=f"{time_ago(ts)}", inline=False)
-                
-                # Add end time if available
-                end_ts = note.get("end_timestamp")
-                if end_ts:
-                    now = datetime.now(timezone.utc).timestamp()
-                    if end_ts > now:
-                        remaining = end_ts - now
-                        mins = int(remaining // 60)
-                        secs = int(remaining % 60)
-                        embed.add_field(
-                            name="⏱️ Ends In", 
-                            value=f"{mins}m {secs}s", 
-                            inline=True
-                        )
-                
-                ch = bot.get_channel(announcement_channel_id)
-                if ch:
-                    msg = await ch.send(embed=embed, view=create_invite_view())
-                    print(f"✅ Sent new announcement to channel {announcement_channel_id}")
-                    # Track for updates
-                    active_events["announcements"][ts] = {
-                        "message_id": msg.id,
-                        "channel_id": announcement_channel_id,
-                        "start_ts": ts,
-                        "end_ts": end_ts,
-                        "content": msg_content
-                    }
-                last_state["announcement"] = ts
-            else:
-                print("⏩ No new announcements found")
+    for category, event in stored["stock"].items():
+        if category in STOCK_CATEGORY_MAPPING:
+            restore("stock", category, stock_record(category, event["start_ts"], event["end_ts"], event["items"]),
+                    event["messages"])
+            rollover_scheduler.schedule(category, event["end_ts"])
+    for weather_id, event in stored["weather"].items():
+        restore("weather", weather_id, weather_record(weather_id, event["weather"]), event["messages"])
+    for ts, event in stored["announcements"].items():
+        restore("announcements", ts, announcement_record(ts, event["end_ts"], event["content"]), event["messages"])
+
+    # Reattach to the posted messages from the channel cache, no fetch_message round-trips
+    attached = edit_scheduler.attach(
+        (m.channel_id, m.message_id) for tracked in restored for m in tracked.messages.values()
+    )
+    if restored:
+        log.info("Restored %d active events, reattached to %d messages", len(restored), attached)
 
-        # Weather events (handled in dedicated function)
-        if weather_channel_id:
-            await check_new_weather()
+# Full stock/announcement/weather check, every 5 minutes until the stock cadence is learned
+@tasks.loop(minutes=5)
+async def fetch_updates():
+    try:
+        log.debug("Running full checks")
+        await ingest.poll(stock_feed)
+        await ingest.poll(weather_feed)
+    finally:
+        fetch_updates.change_interval(seconds=stock_poll.plan())
 
-        save_last_state()
-        print("✅ 5-minute checks completed")
+# --- Live countdown edits ---
+EDIT_CONCURRENCY      = 5    # countdown edits in flight across all channels
+EDIT_CHANNEL_INTERVAL = 1.0  # minimum seconds between edits in one channel
+
+def refresh_interval(remaining) -> float:
+    """Seconds between countdown refreshes for an event with `remaining` seconds left"""
+    if remaining is None or remaining > 600:
+        return 60
+    if remaining > 180:
+        return 30
+    if remaining > 60:
+        return 15
+    return 5
+
+def edit_due(event: TrackedEvent, remaining, now: float) -> bool:
+    """True when a tracked event's messages should be refreshed on this tick"""
+    if now < event.next_edit:
+        return False
+    event.next_edit = now + refresh_interval(remaining)
+    return True
+
+def untrack_message(kind: str, key, channel_id: int, message_id: int):
+    """Stop editing one channel's copy of an event, unless it was already replaced"""
+    event = active_events[kind].get(key)
+    tracked = event.messages.get(channel_id) if event else None
+    if tracked and tracked.message_id == message_id:
+        del event.messages[channel_id]
+        event_store.forget_delivery(kind, key, channel_id)
+        log.warning("%s message not found in channel %s, removing: %s", kind.title(), channel_id, key)
+
+def forget_messages(event: TrackedEvent):
+    for tracked in event.messages.values():
+        edit_scheduler.forget(tracked.message_id)
+
+class EditScheduler:
+    """Coalesces countdown edits per message and sends them under per-channel buckets.
+
+    Only the latest embed submitted for a message is sent, each channel gets
+    at most one edit every `channel_interval` seconds and no more than
+    `concurrency` edits are in flight at once.
+    """
+
+    def __init__(self, concurrency: int = EDIT_CONCURRENCY, channel_interval: float = EDIT_CHANNEL_INTERVAL):
+        self.channel_interval = channel_interval
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._pending = {}      # message_id -> (channel_id, embed, on_missing)
+        self._queues = {}       # channel_id -> deque of message_ids waiting in that channel
+        self._partials = {}     # message_id -> discord.PartialMessage
+        self._busy = set()      # channel_ids with an edit in flight or cooling down
+        self._runnable = set()  # channel_ids to look at on the next wakeup
+        self._tasks = set()
+        self._wakeup = asyncio.Event()
+        self._runner = None
+
+    def start(self):
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._runner is not None:
+            self._runner.cancel()
+            self._runner = None
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def submit(self, channel_id: int, message_id: int, embed: discord.Embed, on_missing=None):
+        # A newer embed for the same message replaces one that hasn't gone out yet
+        if message_id not in self._pending:
+            self._queues.setdefault(channel_id, deque()).append(message_id)
+        self._pending[message_id] = (channel_id, embed, on_missing)
+        self._runnable.add(channel_id)
+        self._wakeup.set()
+
+    def attach(self, messages) -> int:
+        """Cache partial handles for (channel_id, message_id) pairs; returns how many resolved"""
+        attached = 0
+        for channel_id, message_id in messages:
+            if self._partial(channel_id, message_id) is not None:
+                attached += 1
+        return attached
+
+    def forget(self, message_id: int):
+        self._pending.pop(message_id, None)
+        self._partials.pop(message_id, None)
+        if webhook_pool is not None:
+            webhook_pool.forget(message_id)
+
+    def _partial(self, channel_id: int, message_id: int):
+        partial = self._partials.get(message_id)
+        if partial is None:
+            channel = bot.get_channel(channel_id)
+            if channel is None:
+                return None
+            partial = channel.get_partial_message(message_id)
+            self._partials[message_id] = partial
+        return partial
+
+    def _next_message(self, channel_id: int):
+        """Pop the oldest still-pending message queued for a channel"""
+        queue = self._queues.get(channel_id)
+        while queue:
+            message_id = queue.popleft()
+            if message_id in self._pending:  # skip ones forgotten while queued
+                return message_id
+        self._queues.pop(channel_id, None)
+        return None
+
+    def _reopen(self, channel_id: int):
+        self._busy.discard(channel_id)
+        self._runnable.add(channel_id)
+        self._wakeup.set()
+
+    async def _run(self):
+        # Only channels that got new work or reopened are visited, so each
+        # wakeup costs O(changed channels) rather than O(pending edits)
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+
+            runnable, self._runnable = self._runnable, set()
+            for channel_id in runnable:
+                if channel_id in self._busy:
+                    continue  # picked up again when its bucket reopens
+                message_id = self._next_message(channel_id)
+                if message_id is None:
+                    continue
+                _, embed, on_missing = self._pending.pop(message_id)
+                self._busy.add(channel_id)
+                task = asyncio.create_task(self._edit(channel_id, message_id, embed, on_missing))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _edit(self, channel_id: int, message_id: int, embed: discord.Embed, on_missing):
+        try:
+            if webhook_pool is not None:
+                with discord_latency.time(op="webhook_edit"):
+                    if await webhook_pool.edit(channel_id, message_id, embed=embed):
+                        return
+            async with self._semaphore:
+                partial = self._partial(channel_id, message_id)
+                if partial is None:
+                    return
+                with discord_latency.time(op="edit"):
+                    await partial.edit(embed=embed)
+        except discord.NotFound:
+            discord_failures.inc(op="edit")
+            self.forget(message_id)
+            if on_missing:
+                on_missing()
+        except Exception as e:
+            discord_failures.inc(op="edit")
+            log.warning("Error editing message %s: %s", message_id, e)
+        finally:
+            # The channel stays busy until its bucket reopens
+            asyncio.get_running_loop().call_later(self.channel_interval, self._reopen, channel_id)
+
+edit_scheduler = EditScheduler()
+
+def submit_edit(kind: str, key, event: TrackedEvent, now: float, counts: dict):
+    """Queue edits for every copy of an event that would render differently"""
+    template = event.record.template
+    clock = template.clock(now)
+    if clock == event.fingerprint:
+        counts["skipped"] += len(event.messages)
+        return
+    event.fingerprint = clock
+    embed = template.render(clock)
+    for tracked in event.messages.values():
+        if tracked.fingerprint == clock:
+            counts["skipped"] += 1
+            continue
+        tracked.fingerprint = clock
+        counts["sent"] += 1
+        edit_scheduler.submit(
+            tracked.channel_id, tracked.message_id, embed,
+            on_missing=lambda c=tracked.channel_id, m=tracked.message_id: untrack_message(kind, key, c, m)
+        )
 
 # Update active events every 5 seconds (faster countdown)
 @tasks.loop(seconds=5)
 async def update_active_events():
     current_utc = datetime.now(timezone.utc).timestamp()
-    
+    counts = {"sent": 0, "skipped": 0}
+
     # Update stock events
     for key, event in list(active_events["stock"].items()):
         try:
-            channel = bot.get_channel(event["channel_id"])
-            if channel:
-                message = await channel.fetch_message(event["message_id"])
-                
-                # Create updated embed
-                embed = create_stock_embed(
-                    event["items"], 
-                    event["title"], 
-                    event["start_ts"], 
-                    event["end_ts"]
-                )
-                
-                # Only update if the end time hasn't passed
-                if event["end_ts"] > current_utc:
-                    await message.edit(embed=embed)
-                else:
-                    # Remove expired event
-                    del active_events["stock"][key]
-                    print(f"⏩ Removed expired stock event: {key}")
-                    
-                    # Trigger immediate check for new stock
-                    channel_id = get_channel_for_category(key)
-                    if channel_id and key in STOCK_CATEGORY_MAPPING:
-                        api_key, title = STOCK_CATEGORY_MAPPING[key]
-                        asyncio.create_task(
-                            check_new_stock_for_category(key, api_key, channel_id, title)
-                        )
-        except discord.NotFound:
-            # Message was deleted, remove from tracking
-            del active_events["stock"][key]
-            print(f"⚠️ Stock message not found, removing: {key}")
+            # Only update if the end time hasn't passed
+            end_ts = event.record.end_ts
+            if end_ts > current_utc:
+                if edit_due(event, end_ts - current_utc, current_utc):
+                    submit_edit("stock", key, event, current_utc, counts)
+            else:
+                # Remove expired event; rollover_scheduler already re-checks at end_ts
+                del active_events["stock"][key]
+                forget_messages(event)
+                log.debug("Removed expired stock event: %s", key)
         except Exception as e:
-            print(f"⚠️ Error updating stock event: {e}")
-    
+            log.exception("Error updating stock event: %s", e)
+
     # Update weather events
     for wid, event in list(active_events["weather"].items()):
         try:
-            channel = bot.get_channel(event["channel_id"])
-            if channel:
-                message = await channel.fetch_message(event["message_id"])
-                
-                # Create updated embed
-                embed = create_weather_embed(event["weather"])
-                
-                # Check if event is still active
-                w = event["weather"]
-                start_ts = w.get("start_duration_unix",()
-                )
-                
-                # Add time information
-                embed.add_field(name="🕒 Posted", value=f"{time_ago(event['start_ts'])}", inline=False)
-                
-                # Add end time if available
-                if event["end_ts"]:
-                    now = current_utc
-                    if event["end_ts"] > now:
-                        remaining = event["end_ts"] - now
-                        mins = int(remaining // 60)
-                        secs = int(remaining % 60)
-                        embed.add_field(
-                            name="⏱️ Ends In", 
-                            value=f"{mins}m {secs}s", 
-                            inline=True
-                        )
-                
-                # Only update if the end time hasn't passed
-                if not event["end_ts"] or event["end_ts"] > now:
-                    await message.edit(embed=embed)
-                else:
-                    # Remove expired announcement
-                    del active_events["announcements"][key]
-                    print(f"⏩ Removed expired announcement: {key}")
-                    
-                    # Trigger immediate check for new announcements
-                    if announcement_channel_id:
-                        asyncio.create_task(check_new_announcements())
-        except discord.NotFound:
-            del active_events["announcements"][key]
-            print(f"⚠️ Announcement message not found, removing: {key}")
+            # Check if event is still active
+            end_ts = event.record.end_ts
+            if end_ts and end_ts > current_utc:
+                if edit_due(event, end_ts - current_utc, current_utc):
+                    submit_edit("weather", wid, event, current_utc, counts)
+            else:
+                # Remove expired weather event
+                del active_events["weather"][wid]
+                forget_messages(event)
+                log.debug("Removed expired weather event: %s", wid)
+        except Exception as e:
+            log.exception("Error updating weather event: %s", e)
+
+    # Update announcements
+    for key, event in list(active_events["announcements"].items()):
+        try:
+            # Only update if the end time hasn't passed
+            end_ts = event.record.end_ts
+            if not end_ts or end_ts > current_utc:
+                remaining = end_ts - current_utc if end_ts else None
+                if not edit_due(event, remaining, current_utc):
+                    continue
+                submit_edit("announcements", key, event, current_utc, counts)
+            else:
+                # Remove expired announcement
+                del active_events["announcements"][key]
+                forget_messages(event)
+                log.debug("Removed expired announcement: %s", key)
+
+                # Trigger immediate check for new announcements
+                if polling and wants_polling("announcement"):
+                    asyncio.create_task(ingest.poll(stock_feed))
         except Exception as e:
-            print(f"⚠️ Error updating announcement: {e}")
+            log.exception("Error updating announcement: %s", e)
+
+    if counts["sent"] or counts["skipped"]:
+        countdown_edits.inc(counts["sent"], result="sent")
+        countdown_edits.inc(counts["skipped"], result="skipped")
+        log.debug("Countdown edits: %d sent, %d skipped", counts["sent"], counts["skipped"])
 
 # Slash command: calculate item value
 @bot.tree.command(name="calculate", description="Calculate Grow a Garden item value")
 @app_commands.describe(
     item_name="Name or ID of the item",
     weight="Weight of the item",
-    mutation="Mutation type (normal/mutated/ultra)",
-    variant="Variant type (normal/rare/legendary)"
+    mutation="Mutations, comma separated (e.g. wet, frozen)",
+    variant="Variant (normal/gold/rainbow)"
 )
 async def calculate(
     interaction: discord.Interaction,
@@ -716,31 +1847,187 @@ async def calculate(
     mutation: str = "normal",
     variant: str = "normal"
 ):
-    item_name = item_name.lower()
-    fruit = next(
-        (f for f in FRUIT_DATA
-         if f["item_id"] == item_name or f["display_name"].lower() == item_name),
-        None
-    )
+    cat = catalog
+    fruit = cat.fruit_index.get(normalize_name(item_name))
     if not fruit:
         await interaction.response.send_message(f"❌ Item '{item_name}' not found.", ephemeral=True)
         return
 
-    mut_mult = MUTATIONS.get(mutation.lower(), 1)
-    var_mult = VARIANTS.get(variant.lower(), 1)
-    base = fruit["baseValue"]
-    div  = fruit["weightDivisor"]
-    value = round(base * (weight / div) * mut_mult * var_mult, 2)
+    mutations, unknown = cat.parse_mutations(mutation)
+    if unknown:
+        await interaction.response.send_message(f"❌ Unknown mutation: {', '.join(unknown)}", ephemeral=True)
+        return
+    var = cat.variant_index.get(normalize_name(variant))
+    if not var:
+        await interaction.response.send_message(f"❌ Unknown variant '{variant}'.", ephemeral=True)
+        return
+
+    value = round(cat.valuator.value(
+        fruit["item_id"], weight, [m["mutation_id"] for m in mutations], var["variant_id"]
+    ), 2)
 
     embed = discord.Embed(title="🍇 Item Value Calculator", color=discord.Color.purple())
     embed.add_field(name="Item", value=fruit["display_name"], inline=True)
     embed.add_field(name="Weight", value=weight, inline=True)
-    embed.add_field(name="Mutation", value=mutation.title(), inline=True)
-    embed.add_field(name="Variant", value=variant.title(), inline=True)
+    embed.add_field(name="Mutation", value=", ".join(m["display_name"] for m in mutations) or "Normal", inline=True)
+    embed.add_field(name="Variant", value=var["display_name"], inline=True)
     embed.add_field(name="Calculated Value", value=f"${value:,.2f}", inline=False)
 
     await interaction.response.send_message(embed=embed)
 
+def to_choices(entries: list) -> list:
+    return [app_commands.Choice(name=label, value=value) for label, value in entries]
+
+@calculate.autocomplete("item_name")
+async def item_name_autocomplete(interaction: discord.Interaction, current: str):
+    return to_choices(catalog.fruit_search.search(current))
+
+@calculate.autocomplete("mutation")
+async def mutation_autocomplete(interaction: discord.Interaction, current: str):
+    # Complete the last mutation in a comma separated list, keeping the earlier ones
+    head, _, last = current.rpartition(",")
+    prefix = f"{head.strip()}, " if head.strip() else ""
+    return [
+        app_commands.Choice(name=f"{prefix}{label}"[:100], value=f"{prefix}{value}"[:100])
+        for label, value in catalog.mutation_search.search(last)
+    ]
+
+@calculate.autocomplete("variant")
+async def variant_autocomplete(interaction: discord.Interaction, current: str):
+    return to_choices(catalog.variant_search.search(current))
+
+# Slash command: value a whole list of items
+BULK_DISPLAY_LIMIT = 20  # rows listed in the reply; the total covers all of them
+
+@bot.tree.command(name="bulkvalue", description="Calculate the value of many items at once")
+@app_commands.describe(
+    items="Entries separated by ';' as: name, weight[, mutations joined by +][, variant]"
+)
+async def bulk_value(interaction: discord.Interaction, items: str):
+    cat = catalog
+    rows, labels, errors = [], [], []
+    entries = [e.strip() for e in items.split(";") if e.strip()]
+    for n, entry in enumerate(entries, 1):
+        parts = [p.strip() for p in entry.split(",")]
+        fruit = cat.fruit_index.get(normalize_name(parts[0]))
+        try:
+            weight = float(parts[1])
+        except (IndexError, ValueError):
+            weight = None
+        mutations, unknown = cat.parse_mutations(parts[2] if len(parts) > 2 else "")
+        var = cat.variant_index.get(normalize_name(parts[3] if len(parts) > 3 else "normal"))
+
+        if not fruit:
+            errors.append(f"#{n}: item '{parts[0]}' not found")
+        elif weight is None:
+            errors.append(f"#{n}: missing or invalid weight")
+        elif unknown:
+            errors.append(f"#{n}: unknown mutation {', '.join(unknown)}")
+        elif not var:
+            errors.append(f"#{n}: unknown variant '{parts[3]}'")
+        else:
+            rows.append((fruit["item_id"], weight, [m["mutation_id"] for m in mutations], var["variant_id"]))
+            tags = [m["display_name"] for m in mutations]
+            if var["variant_id"] != "normal":
+                tags.append(var["display_name"])
+            labels.append(f"{fruit['display_name']} {weight}kg" + (f" ({', '.join(tags)})" if tags else ""))
+
+    if errors or not rows:
+        await interaction.response.send_message("❌ " + ("\n".join(errors[:10]) or "No items given."), ephemeral=True)
+        return
+
+    values = cat.valuator.value_many(rows)
+    lines = [f"{label}: ${value:,.2f}" for label, value in zip(labels, values)][:BULK_DISPLAY_LIMIT]
+    if len(rows) > BULK_DISPLAY_LIMIT:
+        lines.append(f"...and {len(rows) - BULK_DISPLAY_LIMIT} more")
+
+    embed = discord.Embed(title="🧺 Bulk Item Values", description="\n".join(lines), color=discord.Color.purple())
+    embed.add_field(name="Items", value=str(len(rows)), inline=True)
+    embed.add_field(name="Total Value", value=f"${sum(values):,.2f}", inline=True)
+    await interaction.response.send_message(embed=embed)
+
+@bulk_value.autocomplete("items")
+async def bulk_items_autocomplete(interaction: discord.Interaction, current: str):
+    # Suggest item names for the entry being typed
+    head, _, last = current.rpartition(";")
+    if "," in last:
+        return []
+    prefix = f"{head.strip()}; " if head.strip() else ""
+    return [
+        app_commands.Choice(name=f"{prefix}{label}"[:100], value=f"{prefix}{label}"[:100])
+        for label, _ in catalog.fruit_search.search(last)
+    ]
+
+# Slash command: stock history lookup
+@bot.tree.command(name="lastseen", description="When an item was last in stock")
+@app_commands.describe(item_name="Name or ID of the item")
+async def last_seen(interaction: discord.Interaction, item_name: str):
+    row = await event_store.last_seen(item_name)
+    if not row:
+        await interaction.response.send_message(f"❌ No stock history for '{item_name}'.", ephemeral=True)
+        return
+
+    display_name, category, start_ts, end_ts, quantity = row
+    title = STOCK_CATEGORY_MAPPING.get(category, (None, category))[1]
+    embed = discord.Embed(title=f"🔎 {display_name}", color=discord.Color.teal())
+    embed.add_field(name="Last In Stock", value=time_ago(start_ts), inline=True)
+    embed.add_field(name="Shop", value=title, inline=True)
+    embed.add_field(name="Quantity", value=f"x{quantity}", inline=True)
+    await interaction.response.send_message(embed=embed)
+
+# Slash commands: personal item watches, alerted by DM
+def resolve_watch_item(name: str):
+    """(item_id, display_name) for a typed name or id"""
+    item_id = item_key(name)
+    return item_id, watch_names.get(item_id, name.strip())
+
+@bot.tree.command(name="watch", description="Get a DM when an item shows up in the seed, gear or egg shop")
+@app_commands.describe(item_name="Name of the item to watch")
+async def watch_item(interaction: discord.Interaction, item_name: str):
+    target = ("user", interaction.user.id)
+    item_id, name = resolve_watch_item(item_name)
+    if not item_id:
+        await interaction.response.send_message("❌ Give an item name.", ephemeral=True)
+        return
+    if item_id not in watches.items_for(target) and len(watches.items_for(target)) >= WATCH_LIMIT:
+        await interaction.response.send_message(f"❌ You can watch up to {WATCH_LIMIT} items.", ephemeral=True)
+        return
+    if not watches.add(target, item_id):
+        await interaction.response.send_message(f"⏩ Already watching {name}.", ephemeral=True)
+        return
+    save_watches()
+    note = "" if item_id in watch_names else " It hasn't been in stock yet, so check the spelling."
+    await interaction.response.send_message(f"✅ You'll get a DM when {name} is in stock.{note}", ephemeral=True)
+
+@bot.tree.command(name="unwatch", description="Stop watching an item")
+@app_commands.describe(item_name="Name of the watched item")
+async def unwatch_item(interaction: discord.Interaction, item_name: str):
+    item_id, name = resolve_watch_item(item_name)
+    if not watches.remove(("user", interaction.user.id), item_id):
+        await interaction.response.send_message(f"⏩ You aren't watching {name}.", ephemeral=True)
+        return
+    save_watches()
+    await interaction.response.send_message(f"✅ Stopped watching {name}.", ephemeral=True)
+
+@bot.tree.command(name="watches", description="List the items you're watching")
+async def list_watches(interaction: discord.Interaction):
+    items = watches.items_for(("user", interaction.user.id))
+    if not items:
+        await interaction.response.send_message("👀 You aren't watching any items. Use /watch to add one.", ephemeral=True)
+        return
+    names = sorted(watch_names.get(item_id, item_id) for item_id in items)
+    await interaction.response.send_message(f"👀 Watching {len(names)}/{WATCH_LIMIT}: {', '.join(names)}", ephemeral=True)
+
+@watch_item.autocomplete("item_name")
+async def watch_item_autocomplete(interaction: discord.Interaction, current: str):
+    return to_choices(watch_name_index().search(current))
+
+@unwatch_item.autocomplete("item_name")
+async def unwatch_item_autocomplete(interaction: discord.Interaction, current: str):
+    query = normalize_name(current)
+    names = sorted(watch_names.get(i, i) for i in watches.items_for(("user", interaction.user.id)))
+    return [app_commands.Choice(name=n, value=n) for n in names if query in normalize_name(n)][:25]
+
 # Admin-only decorator
 def admin_only():
     async def predicate(ctx):
@@ -751,61 +2038,113 @@ def admin_only():
     return commands.check(predicate)
 
 # Admin channel setter commands
+async def subscribe_channel(ctx, category: str, label: str):
+    registry.add(ctx.guild.id, category, ctx.channel.id)
+    save_registry()
+    await ctx.send(f"✅ {label} in {ctx.channel.mention}")
+
 @bot.command(name="setseed")  
 @admin_only()
 async def set_seed(ctx):
-    global seed_channel_id
-    seed_channel_id = ctx.channel.id
-    save_channels()
-    await ctx.send(f"✅ Seed stock in {ctx.channel.mention}")
+    await subscribe_channel(ctx, "seed", "Seed stock")
 
 @bot.command(name="setgear")  
 @admin_only()
 async def set_gear(ctx):
-    global gear_channel_id
-    gear_channel_id = ctx.channel.id
-    save_channels()
-    await ctx.send(f"✅ Gear stock in {ctx.channel.mention}")
+    await subscribe_channel(ctx, "gear", "Gear stock")
 
 @bot.command(name="setegg")  
 @admin_only()
 async def set_egg(ctx):
-    global egg_channel_id
-    egg_channel_id = ctx.channel.id
-    save_channels()
-    await ctx.send(f"✅ Egg stock in {ctx.channel.mention}")
+    await subscribe_channel(ctx, "egg", "Egg stock")
 
 @bot.command(name="setcosmetic")
 @admin_only()
 async def set_cosmetic(ctx):
-    global cosmetic_channel_id
-    cosmetic_channel_id = ctx.channel.id
-    save_channels()
-    await ctx.send(f"✅ Cosmetic stock in {ctx.channel.mention}")
+    await subscribe_channel(ctx, "cosmetic", "Cosmetic stock")
 
 @bot.command(name="seteventstock")
 @admin_only()
 async def set_event_stock(ctx):
-    global event_stock_channel_id
-    event_stock_channel_id = ctx.channel.id
-    save_channels()
-    await ctx.send(f"✅ Event stock in {ctx.channel.mention}")
+    await subscribe_channel(ctx, "event_stock", "Event stock")
 
 @bot.command(name="setannounce")
 @admin_only()
 async def set_announce(ctx):
-    global announcement_channel_id
-    announcement_channel_id = ctx.channel.id
-    save_channels()
-    await ctx.send(f"✅ Announcements in {ctx.channel.mention}")
+    await subscribe_channel(ctx, "announcement", "Announcements")
 
 @bot.command(name="setweather")
 @admin_only()
 async def set_weather(ctx):
-    global weather_channel_id
-    weather_channel_id = ctx.channel.id
-    save_channels()
-    await ctx.send(f"✅ Weather in {ctx.channel.mention}")
+    await subscribe_channel(ctx, "weather", "Weather")
+
+@bot.command(name="unset")
+@admin_only()
+async def unset_channel(ctx, category: str = None):
+    if category is None:
+        removed = registry.remove_channel(ctx.guild.id, ctx.channel.id)
+    elif category in CHANNEL_CATEGORIES:
+        removed = [category] if registry.remove(ctx.guild.id, category, ctx.channel.id) else []
+    else:
+        await ctx.send(f"❌ Unknown category. Use one of: {', '.join(CHANNEL_CATEGORIES)}")
+        return
+
+    if not removed:
+        await ctx.send(f"⏩ No matching alerts in {ctx.channel.mention}")
+        return
+    save_registry()
+    await ctx.send(f"✅ Stopped {', '.join(removed)} alerts in {ctx.channel.mention}")
+
+# Admin role watches: ping a role in this channel when an item is stocked
+@bot.command(name="watchrole")
+@admin_only()
+async def watch_role(ctx, role: discord.Role, *, item_name: str):
+    target = ("role", ctx.channel.id, role.id)
+    item_id, name = resolve_watch_item(item_name)
+    if item_id not in watches.items_for(target) and len(watches.items_for(target)) >= WATCH_LIMIT:
+        await ctx.send(f"❌ A role can watch up to {WATCH_LIMIT} items per channel.")
+        return
+    if not watches.add(target, item_id):
+        await ctx.send(f"⏩ {role.name} already watches {name} here")
+        return
+    save_watches()
+    await ctx.send(f"✅ {role.name} will be pinged in {ctx.channel.mention} when {name} is in stock")
+
+@bot.command(name="unwatchrole")
+@admin_only()
+async def unwatch_role(ctx, role: discord.Role, *, item_name: str = None):
+    target = ("role", ctx.channel.id, role.id)
+    if item_name is None:
+        removed = watches.remove_target(target)
+    else:
+        removed = int(watches.remove(target, resolve_watch_item(item_name)[0]))
+    if not removed:
+        await ctx.send(f"⏩ No matching watches for {role.name} in {ctx.channel.mention}")
+        return
+    save_watches()
+    await ctx.send(f"✅ Removed {removed} watch{'es' if removed != 1 else ''} for {role.name}")
+
+# Keep the registry in step with channels and guilds the bot loses
+@bot.event
+async def on_guild_channel_delete(channel):
+    if registry.remove_channel(channel.guild.id, channel.id):
+        save_registry()
+    if watches.remove_channel(channel.id):
+        save_watches()
+    if webhook_pool is not None:
+        webhook_pool.drop(channel.id)
+
+@bot.event
+async def on_guild_remove(guild):
+    registry.remove_guild(guild.id)
+    save_registry()
+    if sum(watches.remove_channel(ch.id) for ch in guild.channels):
+        save_watches()
+    if webhook_pool is not None:
+        for ch in guild.channels:
+            webhook_pool.drop(ch.id)
 
-# Run the bot
-bot.run(TOKEN)
\ No newline at end of file
+# Run the bot; logging is already routed through our queue handler
+if __name__ == "__main__":
+    bot.run(TOKEN, log_handler=None)
+    stop_logging()
\ No newline at end of file
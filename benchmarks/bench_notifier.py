@@ -0,0 +1,345 @@
+"""Load test for the notifier against a local mock upstream and a fake Discord.
+
+    python benchmarks/bench_notifier.py [--channels 1 100 10000] [--latency 0.005]
+
+Nothing talks to the real APIs or Discord. The stock and weather feeds are
+served from localhost with scripted rotations, and channels are in-memory
+fakes that record every send and edit, take `--latency` seconds per call and
+enforce Discord's per-channel rate limit.
+
+Each channel count runs fetch_updates on a fresh rotation, frequent_checks on
+a new weather event and announcement, then update_active_events over
+everything that was posted. Alert latency is measured from the moment the
+upstream payload changed; poll intervals come on top of it in production.
+"""
+import argparse
+import asyncio
+import hashlib
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import deque
+
+from aiohttp import web
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+GUILD_ID            = 1
+RATE_LIMIT_CALLS    = 5    # Discord allows 5 message sends/edits per channel...
+RATE_LIMIT_WINDOW   = 5.0  # ...every 5 seconds
+DEFAULT_CATEGORIES  = ("seed", "gear", "weather", "announcement")
+ITEMS_PER_ROTATION  = 6
+
+# --- Mock upstream ---
+class MockUpstream:
+    """Serves scripted stock and weather payloads with ETags and counts every request"""
+
+    def __init__(self, stock_mapping: dict):
+        self.stock_mapping = stock_mapping
+        self.stock = {}
+        self.weather = {"weather": []}
+        self.hits = {"stock": 0, "weather": 0}
+        self.changed_at = 0.0
+        self._runner = None
+        self.url = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/stock", lambda r: self._serve(r, "stock", [self.stock]))
+        app.router.add_get("/weather", lambda r: self._serve(r, "weather", self.weather))
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+    async def _serve(self, request, feed: str, payload):
+        self.hits[feed] += 1
+        body = json.dumps(payload).encode()
+        etag = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(body=body, content_type="application/json", headers={"ETag": etag})
+
+    def reset(self):
+        self.stock = {}
+        self.weather = {"weather": []}
+
+    def rotate_stock(self, duration: float = 300):
+        """Publish a new rotation for every stock category"""
+        now = time.time()
+        self.stock = {"notification": self.stock.get("notification", [])}
+        for category, (api_key, _) in self.stock_mapping.items():
+            self.stock[api_key] = [
+                {
+                    "item_id": f"{category}_{n}",
+                    "display_name": f"{category.title()} Item {n}",
+                    "quantity": n + 1,
+                    "start_date_unix": now,
+                    "end_date_unix": now + duration,
+                }
+                for n in range(ITEMS_PER_ROTATION)
+            ]
+        self.changed_at = time.perf_counter()
+
+    def publish_weather_and_announcement(self, duration: float = 300):
+        now = time.time()
+        self.weather = {"weather": [{
+            "weather_id": f"storm_{int(now)}",
+            "weather_name": "Thunderstorm",
+            "active": True,
+            "start_duration_unix": now,
+            "end_duration_unix": now + duration,
+            "duration": duration,
+        }]}
+        self.stock["notification"] = [{
+            "message": "Benchmark announcement",
+            "timestamp": now,
+            "end_timestamp": now + duration,
+        }]
+        self.changed_at = time.perf_counter()
+
+# --- Fake Discord ---
+class FakeGuild:
+    def __init__(self, guild_id: int):
+        self.id = guild_id
+
+class FakeMessage:
+    def __init__(self, discord_fake, channel, message_id: int):
+        self.discord = discord_fake
+        self.channel = channel
+        self.id = message_id
+
+    async def edit(self, **kwargs):
+        await self.discord.call(self.channel)
+        self.discord.edits += 1
+        self.discord.record()
+        return self
+
+class FakeChannel:
+    def __init__(self, discord_fake, channel_id: int):
+        self.discord = discord_fake
+        self.id = channel_id
+        self.guild = discord_fake.guild
+        self.calls = deque()
+
+    async def send(self, content=None, **kwargs):
+        await self.discord.call(self)
+        self.discord.sends += 1
+        self.discord.record()
+        return FakeMessage(self.discord, self, self.discord.next_message_id())
+
+    def get_partial_message(self, message_id: int):
+        return FakeMessage(self.discord, self, message_id)
+
+class FakeDiscord:
+    """In-memory channels that charge latency per call and enforce per-channel buckets.
+
+    A call that would exceed the bucket waits for it to reopen, the way
+    discord.py sleeps on a 429, and counts as a rate-limit hit.
+    """
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.guild = FakeGuild(GUILD_ID)
+        self.channels = {}
+        self.sends = 0
+        self.edits = 0
+        self.rate_limited = 0
+        self.first_call = None
+        self.last_call = None
+        self._message_ids = 0
+
+    def add_channels(self, count: int):
+        self.channels = {cid: FakeChannel(self, cid) for cid in range(1, count + 1)}
+
+    def reset_buckets(self):
+        for channel in self.channels.values():
+            channel.calls.clear()
+
+    def get_channel(self, channel_id: int):
+        return self.channels.get(channel_id)
+
+    def next_message_id(self) -> int:
+        self._message_ids += 1
+        return self._message_ids
+
+    def record(self):
+        now = time.perf_counter()
+        if self.first_call is None:
+            self.first_call = now
+        self.last_call = now
+
+    async def call(self, channel: FakeChannel):
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            while channel.calls and channel.calls[0] <= now - RATE_LIMIT_WINDOW:
+                channel.calls.popleft()
+            if len(channel.calls) < RATE_LIMIT_CALLS:
+                break
+            self.rate_limited += 1
+            await asyncio.sleep(channel.calls[0] + RATE_LIMIT_WINDOW - now)
+        channel.calls.append(now)
+        await asyncio.sleep(self.latency)
+
+# --- Harness ---
+def load_bot(workdir: str):
+    """Import GAG-Notif.py as a module, with its state files kept in `workdir`"""
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ["METRICS_PORT"] = "0"
+    os.chdir(workdir)
+    sys.path.insert(0, ROOT)
+    spec = importlib.util.spec_from_file_location("gag_notif", os.path.join(ROOT, "GAG-Notif.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def reset_bot(gag, fake: FakeDiscord, channels: int, categories: tuple):
+    """Fresh subscriptions, state and schedulers for one run"""
+    for events in gag.active_events.values():
+        events.clear()
+    for key in list(gag.last_state):
+        gag.last_state[key] = {} if key == "weather" else 0
+    gag.registry = gag.ChannelRegistry()
+    fake.add_channels(channels)
+    for channel_id in fake.channels:
+        for category in categories:
+            gag.registry.add(GUILD_ID, category, channel_id)
+    gag.edit_scheduler = gag.EditScheduler()
+    gag.edit_scheduler.start()
+    gag.ingest.start()
+
+def expire_feeds(gag):
+    """Make the next read of each feed hit the upstream, as a poll after the snapshot TTL would"""
+    for feed in (gag.stock_feed, gag.weather_feed):
+        feed.fetched_at = 0.0
+
+async def wait_for_edits(gag):
+    scheduler = gag.edit_scheduler
+    while scheduler._pending or scheduler._tasks:
+        await asyncio.sleep(0.01)
+
+async def measure(name: str, channels: int, upstream: MockUpstream, fake: FakeDiscord, work, track_memory: bool):
+    hits = dict(upstream.hits)
+    sends, edits, limited = fake.sends, fake.edits, fake.rate_limited
+    fake.first_call = fake.last_call = None
+    if track_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    await work()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1] if track_memory else None
+    if track_memory:
+        tracemalloc.stop()
+
+    ops = (fake.sends - sends) + (fake.edits - edits)
+    return {
+        "scenario": name,
+        "channels": channels,
+        "seconds": elapsed,
+        "first_alert": fake.first_call - upstream.changed_at if fake.first_call else None,
+        "last_alert": fake.last_call - upstream.changed_at if fake.last_call else None,
+        "ops": ops,
+        "ops_per_s": ops / elapsed if elapsed else 0,
+        "api_calls": sum(upstream.hits.values()) - sum(hits.values()),
+        "rate_limited": fake.rate_limited - limited,
+        "peak_mb": peak / 1e6 if peak is not None else None,
+    }
+
+async def run_channels(gag, upstream: MockUpstream, fake: FakeDiscord, channels: int, args) -> list:
+    reset_bot(gag, fake, channels, tuple(args.categories))
+    upstream.reset()
+    results = []
+
+    async def full_check():
+        upstream.rotate_stock()
+        expire_feeds(gag)
+        await gag.fetch_updates()
+        await gag.ingest.drain()
+    results.append(await measure("fetch_updates", channels, upstream, fake, full_check, args.memory))
+
+    async def frequent():
+        upstream.publish_weather_and_announcement()
+        expire_feeds(gag)
+        gag.weather_poll.next_due = gag.announcement_poll.next_due = 0
+        await gag.frequent_checks()
+        await gag.ingest.drain()
+    results.append(await measure("frequent_checks", channels, upstream, fake, frequent, args.memory))
+
+    async def countdowns():
+        for events in gag.active_events.values():
+            for event in events.values():
+                event.invalidate()  # force a real edit of every tracked message
+        fake.reset_buckets()  # countdown edits normally start well after the sends' buckets drained
+        upstream.changed_at = time.perf_counter()
+        await gag.update_active_events()
+        await wait_for_edits(gag)
+    results.append(await measure("update_active_events", channels, upstream, fake, countdowns, args.memory))
+
+    await gag.edit_scheduler.stop()
+    await gag.watch_notifier.flush()
+    await gag.event_store.flush()
+    return results
+
+def fmt(value, spec: str) -> str:
+    return "-" if value is None else format(value, spec)
+
+def print_table(results: list):
+    header = (f"{'scenario':<22}{'channels':>9}{'wall s':>9}{'first s':>9}{'last s':>9}"
+              f"{'ops':>8}{'ops/s':>9}{'api':>6}{'429s':>7}{'peak MB':>9}")
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['scenario']:<22}{r['channels']:>9}{fmt(r['seconds'], '.3f'):>9}"
+              f"{fmt(r['first_alert'], '.3f'):>9}{fmt(r['last_alert'], '.3f'):>9}{r['ops']:>8}"
+              f"{fmt(r['ops_per_s'], '.0f'):>9}{r['api_calls']:>6}{r['rate_limited']:>7}{fmt(r['peak_mb'], '.1f'):>9}")
+
+async def main(args):
+    with tempfile.TemporaryDirectory(prefix="gag-bench-") as workdir:
+        cwd = os.getcwd()
+        gag = load_bot(workdir)
+        try:
+            upstream = MockUpstream(gag.STOCK_CATEGORY_MAPPING)
+            await upstream.start()
+            gag.stock_feed.url = f"{upstream.url}/stock"
+            gag.weather_feed.url = f"{upstream.url}/weather"
+            fake = FakeDiscord(args.latency)
+            gag.bot.get_channel = fake.get_channel
+
+            results = []
+            for channels in args.channels:
+                results.extend(await run_channels(gag, upstream, fake, channels, args))
+
+            await upstream.stop()
+            await gag.close_http_session()
+            await gag.event_store.close()
+        finally:
+            os.chdir(cwd)
+            gag.stop_logging()
+
+    print_table(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--channels", type=int, nargs="+", default=[1, 100, 10000],
+                        help="subscribed channel counts to run (default: 1 100 10000)")
+    parser.add_argument("--latency", type=float, default=0.005,
+                        help="seconds each fake Discord call takes (default: 0.005)")
+    parser.add_argument("--categories", nargs="+", default=list(DEFAULT_CATEGORIES),
+                        help="alert categories every channel subscribes to")
+    parser.add_argument("--no-memory", dest="memory", action="store_false",
+                        help="skip tracemalloc; memory tracing slows every scenario down")
+    parser.add_argument("--json", help="also write the results to this file")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,179 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from collections import deque
+
+try:
+    import fcntl
+except ImportError:  # no flock on Windows; multi-process mode needs Unix sockets anyway
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+REPLAY_SIZE        = 256      # recent events kept for subscribers that reconnect
+MAX_CLIENT_BUFFER  = 1 << 20  # bytes queued for one subscriber before it's dropped
+LINE_LIMIT         = 1 << 22  # longest event line a subscriber accepts
+RECONNECT_MIN      = 0.5      # seconds before the first reconnect, doubled up to...
+RECONNECT_MAX      = 10.0     # ...this
+
+class EventBroker:
+    """Poller side of the local event bus: newline-delimited JSON over a Unix socket.
+
+    Only the process holding the lock file may bind the socket, which is what
+    guarantees a single poller; the OS drops the lock if that process dies.
+    Events carry the poller's `epoch` and a sequence number so subscribers can
+    skip what they've already seen and replay what they missed.
+    """
+
+    def __init__(self, path: str, replay_size: int = REPLAY_SIZE):
+        self.path = path
+        self.epoch = time.time_ns()
+        self.seq = 0
+        self._replay = deque(maxlen=replay_size)  # (seq, encoded line)
+        self._clients = set()
+        self._handlers = set()
+        self._lock_file = None
+        self._server = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._server is not None
+
+    def try_lock(self) -> bool:
+        """Take the poller lock without blocking; True if this process now holds it"""
+        if self._lock_file is not None:
+            return True
+        if fcntl is None:
+            raise RuntimeError("BROKER_PATH needs a platform with fcntl and Unix sockets")
+        lock_file = open(self.path + ".lock", "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    async def start(self):
+        # Holding the lock means any socket file left behind belongs to a dead poller
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._handle, path=self.path)
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._clients):
+                writer.close()
+            # Closed transports hand the handlers EOF; let them finish rather than be cancelled
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def publish(self, event: dict) -> int:
+        """Send an event to every subscriber; returns its sequence number"""
+        self.seq += 1
+        line = (json.dumps({"epoch": self.epoch, "seq": self.seq, "event": event}) + "\n").encode()
+        self._replay.append((self.seq, line))
+        for writer in list(self._clients):
+            self._send(writer, line)
+        return self.seq
+
+    def _send(self, writer: asyncio.StreamWriter, line: bytes):
+        if writer.transport.get_write_buffer_size() > MAX_CLIENT_BUFFER:
+            # Too far behind; it will reconnect and catch up from the replay buffer
+            log.warning("Dropping slow broker subscriber")
+            self._clients.discard(writer)
+            writer.close()
+            return
+        writer.write(line)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._handlers.add(asyncio.current_task())
+        try:
+            hello = json.loads(await reader.readline() or b"{}")
+            # Same poller: replay only what the subscriber missed; new poller: replay everything
+            since = hello.get("since", 0) if hello.get("epoch") == self.epoch else 0
+            for seq, line in self._replay:
+                if seq > since:
+                    writer.write(line)
+            self._clients.add(writer)
+            await reader.read()  # subscribers never send more; returns at EOF
+        except (ConnectionError, ValueError) as e:
+            log.warning("Broker subscriber error: %s", e)
+        finally:
+            self._handlers.discard(asyncio.current_task())
+            self._clients.discard(writer)
+            writer.close()
+
+class BrokerClient:
+    """Shard side: follows the poller's event stream and hands each event to `handler` once.
+
+    `before_connect` runs ahead of every connection attempt; the bot uses it
+    to try to become the poller when there isn't one.
+    """
+
+    def __init__(self, path: str, handler, before_connect=None):
+        self.path = path
+        self.handler = handler
+        self.before_connect = before_connect
+        self.epoch = None
+        self.seq = 0
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        delay = RECONNECT_MIN
+        while True:
+            if self.before_connect is not None:
+                try:
+                    await self.before_connect()
+                except Exception as e:
+                    log.exception("Poller election failed: %s", e)
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.path, limit=LINE_LIMIT)
+            except OSError as e:
+                log.warning("Broker unavailable, retrying in %.1fs: %s", delay, e)
+                await asyncio.sleep(delay + random.uniform(0, delay / 2))
+                delay = min(RECONNECT_MAX, delay * 2)
+                continue
+
+            delay = RECONNECT_MIN
+            log.info("Connected to event broker at %s", self.path)
+            try:
+                writer.write((json.dumps({"epoch": self.epoch, "since": self.seq}) + "\n").encode())
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    await self._dispatch(json.loads(line))
+            except (ConnectionError, ValueError) as e:
+                log.warning("Broker connection error: %s", e)
+            finally:
+                writer.close()
+            log.warning("Lost connection to event broker")
+
+    async def _dispatch(self, message: dict):
+        if message["epoch"] != self.epoch:
+            self.epoch, self.seq = message["epoch"], 0
+        if message["seq"] <= self.seq:
+            return
+        self.seq = message["seq"]
+        try:
+            await self.handler(message["event"])
+        except Exception as e:
+            log.exception("Failed to deliver broker event: %s", e)
@@ -0,0 +1,143 @@
+import json
+import logging
+import os
+
+from valuation import Valuator
+
+log = logging.getLogger(__name__)
+
+AUTOCOMPLETE_LIMIT = 25  # Discord's maximum number of choices
+PREFIX_MAX = 12          # longest prefix kept in the prefix index
+
+def normalize_name(name: str) -> str:
+    """Lower-case, treat _ and - as spaces and collapse whitespace"""
+    return " ".join(name.lower().replace("_", " ").replace("-", " ").split())
+
+def name_aliases(*names: str) -> set:
+    """Spellings a user might type for an entry: spaced, squashed, without apostrophes"""
+    aliases = set()
+    for name in names:
+        norm = normalize_name(name)
+        for variant in (norm, norm.replace("'", "")):
+            aliases.add(variant)
+            aliases.add(variant.replace(" ", ""))
+    return aliases
+
+def build_lookup(entries: list, id_key: str, label: str) -> dict:
+    """Map every alias of every entry to the entry; the first of any duplicate wins"""
+    lookup = {}
+    for entry in entries:
+        for alias in name_aliases(entry[id_key], entry["display_name"]):
+            other = lookup.get(alias)
+            if other is None:
+                lookup[alias] = entry
+            elif other is not entry:
+                log.warning("Duplicate %s '%s' in catalog, keeping the first %s entry", label, alias, other[id_key])
+    return lookup
+
+class NameIndex:
+    """Prefix + trigram index over display names for autocomplete.
+
+    Prefixes of every word map to entries so typed-ahead names resolve with a
+    dict lookup; trigrams catch typos and mid-word matches.
+    """
+
+    def __init__(self, entries: list):
+        self.entries = entries  # (label, value) pairs, in display order
+        self._prefixes = {}
+        self._trigrams = {}
+        for idx, (label, _) in enumerate(entries):
+            norm = normalize_name(label)
+            words = norm.split()
+            for start in range(len(words)):
+                text = " ".join(words[start:])
+                for n in range(1, min(len(text), PREFIX_MAX) + 1):
+                    bucket = self._prefixes.setdefault(text[:n], [])
+                    if not bucket or bucket[-1] != idx:
+                        bucket.append(idx)
+            padded = f"  {norm} "
+            for i in range(len(padded) - 2):
+                self._trigrams.setdefault(padded[i:i + 3], set()).add(idx)
+
+    def search(self, query: str, limit: int = AUTOCOMPLETE_LIMIT) -> list:
+        query = normalize_name(query)
+        if not query:
+            return self.entries[:limit]
+
+        matches = [
+            idx for idx in self._prefixes.get(query[:PREFIX_MAX], [])
+            if len(query) <= PREFIX_MAX or query in normalize_name(self.entries[idx][0])
+        ][:limit]
+
+        if len(matches) < limit:
+            # Rank everything else by shared trigrams
+            padded = f"  {query} "
+            scores = {}
+            for i in range(len(padded) - 2):
+                for idx in self._trigrams.get(padded[i:i + 3], ()):
+                    scores[idx] = scores.get(idx, 0) + 1
+            seen = set(matches)
+            min_score = max(1, (len(padded) - 2) // 3)
+            ranked = sorted((idx for idx, score in scores.items() if score >= min_score and idx not in seen),
+                            key=lambda idx: -scores[idx])
+            matches.extend(ranked[:limit - len(matches)])
+
+        return [self.entries[idx] for idx in matches]
+
+def unique_choices(entries: list, id_key: str) -> list:
+    seen = {}
+    for entry in entries:
+        seen.setdefault(entry[id_key], (entry["display_name"], entry[id_key]))
+    return list(seen.values())
+
+NO_MUTATION = {"", "normal", "none"}
+
+class Catalog:
+    """Fruits, mutations and variants plus every lookup table derived from them.
+
+    A Catalog is never modified after it's built; reloading builds a new one
+    and swaps the reference, so a command that grabbed the old one finishes
+    with consistent data.
+    """
+
+    def __init__(self, data: dict):
+        self.fruits = tuple(data["fruits"])
+        self.mutations = {m["mutation_id"]: m["multiplier"] for m in data["mutations"]}
+        self.variants = {v["variant_id"]: v["multiplier"] for v in data["variants"]}
+
+        self.fruit_index = build_lookup(self.fruits, "item_id", "fruit")
+        self.mutation_index = build_lookup(data["mutations"], "mutation_id", "mutation")
+        self.variant_index = build_lookup(data["variants"], "variant_id", "variant")
+
+        self.fruit_search = NameIndex(unique_choices(self.fruits, "item_id"))
+        self.mutation_search = NameIndex(unique_choices(data["mutations"], "mutation_id"))
+        self.variant_search = NameIndex(unique_choices(data["variants"], "variant_id"))
+
+        self.valuator = Valuator(self.fruits, self.mutations, self.variants)
+
+    def parse_mutations(self, text: str):
+        """Split 'wet, frozen' or 'wet+frozen' into mutation entries; returns (entries, unknown names)"""
+        found, unknown = [], []
+        for part in text.replace("+", ",").split(","):
+            name = normalize_name(part)
+            if name in NO_MUTATION:
+                continue
+            entry = self.mutation_index.get(name)
+            if entry is None:
+                unknown.append(part.strip())
+            elif entry not in found:
+                found.append(entry)
+        return found, unknown
+
+def file_signature(path: str):
+    """Cheap change check for the catalog file: (mtime, size)"""
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+def load_catalog(path: str) -> Catalog:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    for key in ("fruits", "mutations", "variants"):
+        if not isinstance(data.get(key), list):
+            raise ValueError(f"{path}: '{key}' must be a list")
+    return Catalog(data)
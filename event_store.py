@@ -0,0 +1,258 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+# Pending rows are written in one transaction once this many pile up,
+# or FLUSH_INTERVAL seconds after the first one, whichever comes first
+FLUSH_BATCH    = 200
+FLUSH_INTERVAL = 1.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stock_rotations (
+    category TEXT    NOT NULL,
+    start_ts INTEGER NOT NULL,
+    end_ts   INTEGER NOT NULL,
+    items    TEXT    NOT NULL,
+    PRIMARY KEY (category, start_ts)
+);
+CREATE INDEX IF NOT EXISTS idx_rotations_end ON stock_rotations (end_ts);
+
+CREATE TABLE IF NOT EXISTS stock_items (
+    item_id      TEXT    NOT NULL,
+    display_name TEXT    NOT NULL,
+    category     TEXT    NOT NULL,
+    start_ts     INTEGER NOT NULL,
+    end_ts       INTEGER NOT NULL,
+    quantity     INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (category, start_ts, item_id)
+);
+CREATE INDEX IF NOT EXISTS idx_items_item ON stock_items (item_id, start_ts);
+CREATE INDEX IF NOT EXISTS idx_items_name ON stock_items (display_name COLLATE NOCASE, start_ts);
+
+CREATE TABLE IF NOT EXISTS weather_events (
+    weather_id TEXT    NOT NULL,
+    start_ts   INTEGER NOT NULL,
+    end_ts     INTEGER,
+    payload    TEXT    NOT NULL,
+    PRIMARY KEY (weather_id, start_ts)
+);
+CREATE INDEX IF NOT EXISTS idx_weather_time ON weather_events (start_ts);
+CREATE INDEX IF NOT EXISTS idx_weather_end ON weather_events (end_ts);
+
+CREATE TABLE IF NOT EXISTS announcements (
+    ts      REAL PRIMARY KEY,
+    end_ts  INTEGER,
+    message TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_announcements_end ON announcements (end_ts);
+
+-- Posted alerts whose countdowns are still being edited; event_key keeps
+-- whatever type the bot uses as the key (category, weather id or timestamp)
+CREATE TABLE IF NOT EXISTS tracked_messages (
+    kind       TEXT    NOT NULL,
+    event_key          NOT NULL,
+    channel_id INTEGER NOT NULL,
+    message_id INTEGER NOT NULL,
+    expires_at REAL,
+    PRIMARY KEY (kind, event_key, channel_id)
+);
+CREATE INDEX IF NOT EXISTS idx_tracked_expiry ON tracked_messages (expires_at);
+"""
+
+# Announcements without an end stay live until a newer one replaces them:
+# close their history row at the newer one's timestamp and stop tracking them
+SUPERSEDE_ANNOUNCEMENTS = (
+    "UPDATE announcements SET end_ts = ?1 WHERE end_ts IS NULL AND ts < ?1",
+    "DELETE FROM tracked_messages WHERE kind = 'announcements' AND expires_at IS NULL AND event_key < ?1",
+)
+
+def item_key(name: str) -> str:
+    """Normalise a display name or id to the upstream item_id form"""
+    return name.strip().lower().replace(" ", "_")
+
+class EventStore:
+    """SQLite history of every stock rotation, weather occurrence and announcement.
+
+    Writers only append to an in-memory batch on the event loop; batches are
+    inserted in a single transaction from a worker thread. The database runs
+    in WAL mode so history queries never wait on a write.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = None
+        self._db_lock = threading.Lock()
+        self._pending = []  # (sql, params) rows waiting for the next flush
+        self._timer = None
+        self._flushes = set()
+
+    def open(self):
+        if self._conn is not None:
+            return
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        with self._conn:
+            self._conn.execute("DELETE FROM tracked_messages WHERE expires_at <= ?", (time.time(),))
+            latest = self._conn.execute("SELECT MAX(ts) FROM announcements").fetchone()[0]
+            if latest is not None:
+                for sql in SUPERSEDE_ANNOUNCEMENTS:
+                    self._conn.execute(sql, (latest,))
+
+    async def close(self):
+        await self.flush()
+        if self._conn is not None:
+            with self._db_lock:
+                self._conn.close()
+            self._conn = None
+
+    # --- Recording ---
+    def record_stock(self, category: str, start_ts: int, end_ts: int, items: list):
+        self._queue(
+            "INSERT OR IGNORE INTO stock_rotations (category, start_ts, end_ts, items) VALUES (?, ?, ?, ?)",
+            (category, start_ts, end_ts, json.dumps(items))
+        )
+        for i in items:
+            item_id = i.get("item_id") or item_key(i.get("display_name", ""))
+            self._queue(
+                "INSERT OR IGNORE INTO stock_items "
+                "(item_id, display_name, category, start_ts, end_ts, quantity) VALUES (?, ?, ?, ?, ?, ?)",
+                (item_id, i.get("display_name", item_id), category, start_ts, end_ts, i.get("quantity", 0))
+            )
+
+    def record_weather(self, weather_id: str, start_ts: int, end_ts, payload: dict):
+        self._queue(
+            "INSERT OR IGNORE INTO weather_events (weather_id, start_ts, end_ts, payload) VALUES (?, ?, ?, ?)",
+            (weather_id, start_ts, end_ts, json.dumps(payload))
+        )
+
+    def record_announcement(self, ts: int, end_ts, message: str):
+        self._queue(
+            "INSERT OR IGNORE INTO announcements (ts, end_ts, message) VALUES (?, ?, ?)",
+            (ts, end_ts, message)
+        )
+        for sql in SUPERSEDE_ANNOUNCEMENTS:
+            self._queue(sql, (ts,))
+
+    def record_delivery(self, kind: str, key, expires_at, messages: dict):
+        """Remember which messages carry an event so a restart can keep editing them"""
+        for channel_id, message_id in messages.items():
+            self._queue(
+                "INSERT OR REPLACE INTO tracked_messages "
+                "(kind, event_key, channel_id, message_id, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (kind, key, channel_id, message_id, expires_at)
+            )
+
+    def forget_delivery(self, kind: str, key, channel_id: int):
+        self._queue(
+            "DELETE FROM tracked_messages WHERE kind = ? AND event_key = ? AND channel_id = ?",
+            (kind, key, channel_id)
+        )
+
+    def _queue(self, sql: str, params: tuple):
+        self._pending.append((sql, params))
+        if len(self._pending) >= FLUSH_BATCH:
+            task = asyncio.create_task(self.flush())
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+        elif self._timer is None or self._timer.done():
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(FLUSH_INTERVAL)
+        # Rows queued while this batch writes get a timer of their own
+        self._timer = None
+        await self.flush()
+
+    async def flush(self):
+        if not self._pending or self._conn is None:
+            return
+        batch, self._pending = self._pending, []
+        try:
+            await asyncio.to_thread(self._write, batch)
+        except Exception as e:
+            log.error("Event store write failed, %d rows dropped: %s", len(batch), e)
+
+    def _write(self, batch: list):
+        with self._db_lock, self._conn:
+            for sql, params in batch:
+                self._conn.execute(sql, params)
+
+    # --- Queries ---
+    def _query(self, sql: str, params: tuple = ()):
+        with self._db_lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    async def last_seen(self, name: str):
+        """Most recent rotation containing an item, as (display_name, category, start_ts, end_ts, quantity)"""
+        rows = await asyncio.to_thread(
+            self._query,
+            "SELECT display_name, category, start_ts, end_ts, quantity FROM stock_items "
+            "WHERE item_id = ? OR display_name = ? COLLATE NOCASE "
+            "ORDER BY start_ts DESC LIMIT 1",
+            (item_key(name), name.strip())
+        )
+        return rows[0] if rows else None
+
+    def stocked_items(self, categories) -> list:
+        """Distinct (item_id, display_name) pairs ever stocked in the given categories"""
+        marks = ", ".join("?" * len(categories))
+        return self._query(
+            f"SELECT DISTINCT item_id, display_name FROM stock_items WHERE category IN ({marks})",
+            tuple(categories)
+        )
+
+    def load_active(self, now: float = None) -> dict:
+        """Events that haven't ended yet, shaped like the bot's active_events payloads.
+
+        Each event carries a `messages` map of channel_id -> message_id for
+        the alerts that were posted for it.
+        """
+        now = time.time() if now is None else now
+        tracked = {}
+        for kind, key, channel_id, message_id in self._query(
+            "SELECT kind, event_key, channel_id, message_id FROM tracked_messages "
+            "WHERE expires_at IS NULL OR expires_at > ?", (now,)
+        ):
+            tracked.setdefault((kind, key), {})[channel_id] = message_id
+
+        stock = {}
+        for category, start_ts, end_ts, items in self._query(
+            "SELECT category, start_ts, end_ts, items FROM stock_rotations "
+            "WHERE end_ts > ? ORDER BY start_ts", (now,)
+        ):
+            # Later rotations of the same category win
+            stock[category] = {
+                "start_ts": start_ts,
+                "end_ts": end_ts,
+                "items": json.loads(items),
+                "messages": tracked.get(("stock", category), {})
+            }
+
+        weather = {}
+        for weather_id, payload in self._query(
+            "SELECT weather_id, payload FROM weather_events WHERE end_ts > ? ORDER BY start_ts", (now,)
+        ):
+            weather[weather_id] = {
+                "weather": json.loads(payload),
+                "messages": tracked.get(("weather", weather_id), {})
+            }
+
+        announcements = {}
+        for ts, end_ts, message in self._query(
+            "SELECT ts, end_ts, message FROM announcements WHERE end_ts IS NULL OR end_ts > ? ORDER BY ts", (now,)
+        ):
+            announcements[ts] = {
+                "start_ts": ts,
+                "end_ts": end_ts,
+                "content": message,
+                "messages": tracked.get(("announcements", ts), {})
+            }
+
+        return {"stock": stock, "weather": weather, "announcements": announcements}
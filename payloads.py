@@ -0,0 +1,202 @@
+import json
+import logging
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # the stdlib parser takes bytes too, just slower
+    _loads = json.loads
+
+log = logging.getLogger(__name__)
+
+_NUMBERS = frozenset((int, float))  # exact types, so booleans don't pass as numbers
+
+class PayloadError(ValueError):
+    """An upstream response parsed as JSON but doesn't have the expected shape"""
+
+def _number(obj: dict, key: str, default=0):
+    value = obj.get(key)
+    if value is None:
+        return default
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise PayloadError(f"{key} is {type(value).__name__}, expected a number")
+    return value
+
+def _text(obj: dict, key: str, default: str = "") -> str:
+    value = obj.get(key)
+    if value is None:
+        return default
+    if not isinstance(value, str):
+        raise PayloadError(f"{key} is {type(value).__name__}, expected a string")
+    return value
+
+def _objects(obj: dict, key: str) -> list:
+    """The objects in a list field; other entries are logged and skipped"""
+    value = obj.get(key)
+    if value is None:
+        return []
+    if not isinstance(value, list):
+        raise PayloadError(f"{key} is {type(value).__name__}, expected a list")
+    objects = [v for v in value if isinstance(v, dict)]
+    if len(objects) != len(value):
+        log.warning("Skipping %d non-object entries in %s", len(value) - len(objects), key)
+    return objects
+
+def _decode_each(decode, objects: list, key: str) -> list:
+    """Decode every object, logging and skipping the ones that don't fit"""
+    decoded = []
+    for obj in objects:
+        try:
+            decoded.append(decode(obj))
+        except PayloadError as e:
+            log.warning("Skipping entry in %s: %s", key, e)
+    return decoded
+
+def _load_object(body: bytes) -> dict:
+    try:
+        raw = _loads(body)
+    except ValueError as e:
+        raise PayloadError(f"invalid JSON: {e}") from e
+    if isinstance(raw, list):  # the stock API wraps its object in a one-element list
+        raw = raw[0] if raw else {}
+    if not isinstance(raw, dict):
+        raise PayloadError(f"top level is {type(raw).__name__}, expected an object")
+    return raw
+
+# --- Stock ---
+class StockItem:
+    __slots__ = ("item_id", "display_name", "quantity", "start_ts", "end_ts")
+
+    def __init__(self, item_id: str, display_name: str, quantity: int, start_ts: float, end_ts: float):
+        self.item_id = item_id
+        self.display_name = display_name
+        self.quantity = quantity
+        self.start_ts = start_ts
+        self.end_ts = end_ts
+
+    @classmethod
+    def decode(cls, obj: dict) -> "StockItem":
+        # Hot path: hundreds per poll, so the type checks are inlined
+        get = obj.get
+        item_id = get("item_id") or ""
+        display_name = get("display_name") or item_id or "Unknown"
+        quantity = get("quantity") or 0
+        start_ts = get("start_date_unix") or 0
+        end_ts = get("end_date_unix") or 0
+        if not (type(item_id) is str and type(display_name) is str and type(quantity) in _NUMBERS
+                and type(start_ts) in _NUMBERS and type(end_ts) in _NUMBERS):
+            raise PayloadError(f"malformed stock item {obj!r:.200}")
+        return cls(item_id, display_name, quantity, start_ts, end_ts)
+
+    def to_dict(self) -> dict:
+        """The upstream field names, for the event store, the broker and embeds"""
+        return {
+            "item_id": self.item_id,
+            "display_name": self.display_name,
+            "quantity": self.quantity,
+            "start_date_unix": self.start_ts,
+            "end_date_unix": self.end_ts,
+        }
+
+class Rotation:
+    """One shop category's current stock; it runs from the latest item start to the latest item end"""
+    __slots__ = ("items", "start_ts", "end_ts")
+
+    def __init__(self, items: tuple):
+        self.items = items
+        self.start_ts = max(i.start_ts for i in items)
+        self.end_ts = max(i.end_ts for i in items)
+
+class Notification:
+    __slots__ = ("message", "ts", "end_ts")
+
+    def __init__(self, message: str, ts: float, end_ts):
+        self.message = message
+        self.ts = ts
+        self.end_ts = end_ts
+
+class StockPayload:
+    """The stock API response: non-empty rotations by API key (`seed_stock`, ...) and the current announcement"""
+    __slots__ = ("rotations", "notification")
+
+    def __init__(self, rotations: dict, notification: Notification = None):
+        self.rotations = rotations
+        self.notification = notification
+
+def _decode_notification(raw: dict):
+    notes = _objects(raw, "notification")
+    if not notes:
+        return None
+    message = _text(notes[0], "message")
+    if not message:
+        return None
+    return Notification(message, _number(notes[0], "timestamp"), _number(notes[0], "end_timestamp", None))
+
+def decode_stock(body: bytes, keys) -> StockPayload:
+    """Decode the rotations under the API `keys` the bot uses, plus the announcement.
+
+    Only a response that isn't a JSON object fails; a malformed category,
+    item or announcement is logged and left out, so it can't hold up the rest.
+    """
+    raw = _load_object(body)
+    rotations = {}
+    for key in keys:
+        try:
+            items = tuple(_decode_each(StockItem.decode, _objects(raw, key), key))
+        except PayloadError as e:
+            log.warning("Skipping %s: %s", key, e)
+            continue
+        if items:
+            rotations[key] = Rotation(items)
+
+    try:
+        notification = _decode_notification(raw)
+    except PayloadError as e:
+        log.warning("Skipping notification: %s", e)
+        notification = None
+    return StockPayload(rotations, notification)
+
+# --- Weather ---
+class WeatherEvent:
+    __slots__ = ("weather_id", "name", "active", "start_ts", "end_ts", "duration")
+
+    def __init__(self, weather_id: str, name: str, active: bool, start_ts: float, end_ts, duration: float):
+        self.weather_id = weather_id
+        self.name = name
+        self.active = active
+        self.start_ts = start_ts
+        self.end_ts = end_ts
+        self.duration = duration
+
+    @classmethod
+    def decode(cls, obj: dict) -> "WeatherEvent":
+        start_ts = _number(obj, "start_duration_unix")
+        duration = _number(obj, "duration")
+        # Older payloads only give a duration
+        end_ts = _number(obj, "end_duration_unix", None)
+        if end_ts is None and start_ts and duration:
+            end_ts = start_ts + duration
+        return cls(_text(obj, "weather_id"), _text(obj, "weather_name", "Unknown Weather"),
+                   bool(obj.get("active")), start_ts, end_ts, duration)
+
+    def to_dict(self) -> dict:
+        return {
+            "weather_id": self.weather_id,
+            "weather_name": self.name,
+            "active": self.active,
+            "start_duration_unix": self.start_ts,
+            "end_duration_unix": self.end_ts,
+            "duration": self.duration,
+        }
+
+class WeatherPayload:
+    __slots__ = ("events",)
+
+    def __init__(self, events: tuple):
+        self.events = events
+
+def decode_weather(body: bytes) -> WeatherPayload:
+    raw = _load_object(body)
+    # Entries without an id can't be tracked or deduplicated
+    entries = [o for o in _objects(raw, "weather") if o.get("weather_id")]
+    return WeatherPayload(tuple(_decode_each(WeatherEvent.decode, entries, "weather")))
@@ -0,0 +1,81 @@
+import asyncio
+import logging
+
+log = logging.getLogger(__name__)
+
+DRAIN_TIMEOUT = 10.0  # seconds shutdown waits for consumers to finish queued events
+
+class EventPipeline:
+    """Fetch, decode, diff and emit for a set of upstream feeds.
+
+    `poll(feed)` fetches through the feed's snapshot, which also decodes the
+    response, and diffs each response version exactly once however many
+    loops ask for it. The new events go onto every consumer's queue; each
+    consumer drains its own queue, in order, in its own task, so slow
+    channel delivery never holds up the history store or metrics.
+    """
+
+    def __init__(self):
+        self._differs = {}    # feed -> diff(payload) -> [event]
+        self._diffed = {}     # feed -> payload version last diffed
+        self._consumers = {}  # name -> (handler, queue)
+        self._tasks = {}      # name -> consumer task
+
+    def add_feed(self, feed, diff):
+        """`diff` turns a decoded payload into the events it adds; it must not await"""
+        self._differs[feed] = diff
+
+    def subscribe(self, name: str, handler):
+        """Call `handler(event)` for every event emitted from now on"""
+        self._consumers[name] = (handler, asyncio.Queue())
+        if self._tasks:
+            self.start()
+
+    def start(self):
+        for name, (handler, queue) in self._consumers.items():
+            task = self._tasks.get(name)
+            if task is None or task.done():
+                self._tasks[name] = asyncio.create_task(self._consume(name, handler, queue))
+
+    async def drain(self):
+        """Wait until every consumer has handled everything emitted so far"""
+        await asyncio.gather(*(queue.join() for _, queue in self._consumers.values()))
+
+    async def stop(self, timeout: float = DRAIN_TIMEOUT):
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self.drain(), timeout)
+        except asyncio.TimeoutError:
+            log.warning("Stopping with %d events still queued",
+                        sum(queue.qsize() for _, queue in self._consumers.values()))
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+
+    async def poll(self, feed, max_age: float = None) -> list:
+        """Fetch `feed` and emit what's new in it; returns the emitted events"""
+        payload = await feed.get(max_age=max_age)
+        if payload is None or self._diffed.get(feed) == feed.version:
+            return []
+        # Diffing doesn't await, so nothing else sees this version half-processed
+        self._diffed[feed] = feed.version
+        events = self._differs[feed](payload)
+        for event in events:
+            self.emit(event)
+        log.debug("%s feed version %d: %d new events", feed.name, feed.version, len(events))
+        return events
+
+    def emit(self, event: dict):
+        for _, queue in self._consumers.values():
+            queue.put_nowait(event)
+
+    async def _consume(self, name: str, handler, queue: asyncio.Queue):
+        while True:
+            event = await queue.get()
+            try:
+                await handler(event)
+            except Exception as e:
+                log.exception("%s consumer failed on a %s event: %s", name, event.get("kind"), e)
+            finally:
+                queue.task_done()
@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import logging.handlers
+import queue
+import time
+from contextlib import contextmanager
+
+from aiohttp import web
+
+# --- Logging ---
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+class KeyValueFormatter(logging.Formatter):
+    """logfmt lines: time, level, logger and message, then any `extra=` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                fields[key] = value
+        line = " ".join(f"{k}={_quote(v)}" for k, v in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+def _quote(value) -> str:
+    text = str(value)
+    if not text or any(c in text for c in ' "='):
+        return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+    return text
+
+_listener = None
+
+def setup_logging(level="INFO"):
+    """Route all logging through a queue so the event loop never blocks on stdout.
+
+    Records are formatted and written by a QueueListener thread; the loop
+    only pays for an in-memory put.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    output = logging.StreamHandler()
+    output.setFormatter(KeyValueFormatter())
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers[:] = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(level)
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+
+def stop_logging():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+# discord.py's warnings for a 429; a global one is logged right after the first
+RATE_LIMITED_429 = ("We are being rate limited.", "Webhook ID %s is rate limited.")
+GLOBAL_429       = "Global rate limit has been hit."
+
+class RateLimitCounter(logging.Handler):
+    """Counts discord.py's 429s, which are only reported through logging.
+
+    Each 429 logs one warning, plus a second one if it was global. Both come
+    before discord.py yields to the loop, so a hit is counted on the next
+    loop iteration, by then knowing its scope.
+    """
+
+    def __init__(self, counter: "Counter"):
+        super().__init__(logging.WARNING)
+        self.counter = counter
+        self._scope = None  # scope of a hit logged but not counted yet
+
+    def emit(self, record: logging.LogRecord):
+        template = record.msg if isinstance(record.msg, str) else ""
+        if template.startswith(GLOBAL_429):
+            if self._scope is None:
+                self.counter.inc(scope="global")
+            else:
+                self._scope = "global"
+        elif template.startswith(RATE_LIMITED_429):
+            self._count()
+            self._scope = "route"
+            try:
+                asyncio.get_running_loop().call_soon(self._count)
+            except RuntimeError:  # not logged from the loop; nothing will follow it
+                self._count()
+
+    def _count(self):
+        if self._scope is not None:
+            self.counter.inc(scope=self._scope)
+            self._scope = None
+
+# --- Metrics ---
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_metrics = []
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+def _label_text(key: tuple, extra: tuple = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values = {}
+        _metrics.append(self)
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        for key, value in self._values.items():
+            yield self.name, key, value
+
+class Gauge(Counter):
+    """A settable value; with `fn` the value is read from it at scrape time"""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, fn=None):
+        super().__init__(name, help)
+        self.fn = fn
+
+    def set(self, value: float, **labels):
+        self._values[_label_key(labels)] = value
+
+    def samples(self):
+        if self.fn is not None:
+            values = self.fn()
+            if not isinstance(values, dict):
+                values = {(): values}
+            for labels, value in values.items():
+                yield self.name, _label_key(dict(labels)), value
+        yield from super().samples()
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self._series = {}  # label key -> [bucket counts..., sum, count]
+        _metrics.append(self)
+
+    def observe(self, value: float, **labels):
+        series = self._series.setdefault(_label_key(labels), [0] * (len(self.buckets) + 2))
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        for key, series in self._series.items():
+            for bound, count in zip(self.buckets, series):
+                yield f"{self.name}_bucket", key + (("le", bound),), count
+            yield f"{self.name}_bucket", key + (("le", "+Inf"),), series[-1]
+            yield f"{self.name}_sum", key, series[-2]
+            yield f"{self.name}_count", key, series[-1]
+
+def render_metrics() -> str:
+    """Every registered metric in the Prometheus text exposition format"""
+    lines = []
+    for metric in _metrics:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, key, value in metric.samples():
+            lines.append(f"{name}{_label_text(key)} {value}")
+    return "\n".join(lines) + "\n"
+
+async def start_metrics_server(host: str, port: int) -> web.AppRunner:
+    async def handle(request):
+        return web.Response(text=render_metrics(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+async def watch_loop_lag(gauge: Gauge, interval: float = 1.0):
+    """Keep `gauge` at how late the loop wakes from a sleep of `interval` seconds"""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        gauge.set(max(0.0, loop.time() - start - interval))
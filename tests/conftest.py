@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+@pytest.fixture(scope="session")
+def gag(tmp_path_factory):
+    """The bot script loaded as a module, with its state files in a scratch directory"""
+    pytest.importorskip("discord")
+    pytest.importorskip("aiohttp")
+    import bench_notifier
+
+    cwd = os.getcwd()
+    module = bench_notifier.load_bot(str(tmp_path_factory.mktemp("gag")))
+    yield module
+    os.chdir(cwd)
+    module.stop_logging()
@@ -0,0 +1,30 @@
+import argparse
+import asyncio
+
+def test_harness_smoke(gag):
+    """One channel through the load-test harness: every alert sent once, every copy edited once"""
+    import bench_notifier
+
+    async def main():
+        upstream = bench_notifier.MockUpstream(gag.STOCK_CATEGORY_MAPPING)
+        await upstream.start()
+        gag.stock_feed.url = f"{upstream.url}/stock"
+        gag.weather_feed.url = f"{upstream.url}/weather"
+        fake = bench_notifier.FakeDiscord(latency=0)
+        gag.bot.get_channel = fake.get_channel
+        args = argparse.Namespace(categories=list(bench_notifier.DEFAULT_CATEGORIES), memory=False)
+        try:
+            results = await bench_notifier.run_channels(gag, upstream, fake, 1, args)
+        finally:
+            await upstream.stop()
+            await gag.close_http_session()
+        return results, fake
+
+    results, fake = asyncio.run(main())
+    by_scenario = {r["scenario"]: r for r in results}
+    # Seed and gear rotations, then the weather event and the announcement
+    assert (by_scenario["fetch_updates"]["ops"], by_scenario["fetch_updates"]["api_calls"]) == (2, 2)
+    assert (by_scenario["frequent_checks"]["ops"], by_scenario["frequent_checks"]["api_calls"]) == (2, 2)
+    # Countdown edits run from cached state
+    assert (by_scenario["update_active_events"]["ops"], by_scenario["update_active_events"]["api_calls"]) == (4, 0)
+    assert (fake.sends, fake.edits, fake.rate_limited) == (4, 4, 0)
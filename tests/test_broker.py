@@ -0,0 +1,60 @@
+import asyncio
+import sys
+
+import pytest
+
+from broker import BrokerClient, EventBroker
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="the broker needs Unix sockets and flock")
+
+async def wait_for(predicate, timeout: float = 2.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not predicate():
+        assert loop.time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+def test_subscribers_replay_missed_events_once(tmp_path):
+    path = str(tmp_path / "b.sock")
+
+    async def main():
+        broker = EventBroker(path)
+        assert broker.try_lock()
+        assert not EventBroker(path).try_lock()  # one poller per socket
+        await broker.start()
+        broker.publish({"n": 1})
+        broker.publish({"n": 2})
+
+        received = []
+
+        async def handle(event):
+            received.append(event["n"])
+        client = BrokerClient(path, handle)
+        client.start()
+        await wait_for(lambda: len(received) == 2)
+        broker.publish({"n": 3})
+        await wait_for(lambda: len(received) == 3)
+
+        # A late subscriber that already saw up to seq 2 only gets what it missed
+        late = []
+
+        async def handle_late(event):
+            late.append(event["n"])
+        resumed = BrokerClient(path, handle_late)
+        resumed.epoch, resumed.seq = broker.epoch, 2
+        resumed.start()
+        await wait_for(lambda: late == [3])
+
+        # Redelivered sequence numbers are skipped
+        await client._dispatch({"epoch": broker.epoch, "seq": 3, "event": {"n": 3}})
+        # A new poller starts a new epoch and its sequence over
+        await client._dispatch({"epoch": broker.epoch + 1, "seq": 1, "event": {"n": 4}})
+
+        client.stop()
+        resumed.stop()
+        await broker.close()
+        return received, late
+
+    received, late = asyncio.run(main())
+    assert received == [1, 2, 3, 4]
+    assert late == [3]
@@ -0,0 +1,36 @@
+import os
+
+import pytest
+
+from catalog import NameIndex, load_catalog
+from valuation import Valuator
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture(scope="module")
+def catalog():
+    return load_catalog(os.path.join(ROOT, "catalog.json"))
+
+def test_name_index_prefix_and_typo():
+    index = NameIndex([("Blood Banana", "blood_banana"), ("Banana", "banana"), ("Candy Blossom", "candy_blossom")])
+    # Any word's prefix matches, in display order
+    assert index.search("ban") == [("Blood Banana", "blood_banana"), ("Banana", "banana")]
+    assert index.search("cand") == [("Candy Blossom", "candy_blossom")]
+    assert index.search("blosom")[0] == ("Candy Blossom", "candy_blossom")
+    assert len(index.search("", limit=2)) == 2
+
+def test_catalog_lookups(catalog):
+    assert catalog.fruit_index["candyblossom"]["item_id"] == "candy_blossom"
+    found, unknown = catalog.parse_mutations("wet + frozen, nope")
+    assert [m["mutation_id"] for m in found] == ["wet", "frozen"]
+    assert unknown == ["nope"]
+
+def test_value_many_matches_value():
+    fruits = [{"item_id": "a", "baseValue": 100, "weightDivisor": 2},
+              {"item_id": "b", "baseValue": 50, "weightDivisor": 1},
+              {"item_id": "a", "baseValue": 999, "weightDivisor": 1}]
+    valuator = Valuator(fruits, {"wet": 2, "shocked": 100}, {"normal": 1, "gold": 20})
+    rows = [("a", 4, (), "normal"), ("b", 1, ("wet", "shocked"), "gold"), ("a", 2, ("unknown",), "other")]
+    assert valuator.value_many(rows) == pytest.approx([valuator.value(*row) for row in rows])
+    assert valuator.value_many(rows) == pytest.approx([200, 50 * 101 * 20, 100])
+    assert valuator.value_many([]) == []
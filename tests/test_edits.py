@@ -0,0 +1,73 @@
+import asyncio
+import time
+
+import pytest
+
+class Message:
+    def __init__(self, channel, message_id: int):
+        self.channel = channel
+        self.id = message_id
+
+    async def edit(self, embed=None, **kwargs):
+        self.channel.edits.append((self.id, embed, asyncio.get_running_loop().time()))
+
+class Channel:
+    """Records edits as (message_id, embed, loop time) and hands out numbered messages"""
+
+    def __init__(self, channel_id: int):
+        self.id = channel_id
+        self.edits = []
+        self.sent = 0
+
+    def get_partial_message(self, message_id: int):
+        return Message(self, message_id)
+
+    async def send(self, embed=None, **kwargs):
+        self.sent += 1
+        return Message(self, self.id * 1000 + self.sent)
+
+@pytest.fixture
+def channels(gag, monkeypatch):
+    channels = {cid: Channel(cid) for cid in (1, 2)}
+    monkeypatch.setattr(gag.bot, "get_channel", channels.get)
+    return channels
+
+def test_scheduler_coalesces_and_spaces_edits(gag, channels):
+    async def main():
+        scheduler = gag.EditScheduler(channel_interval=0.1)
+        scheduler.start()
+        # Three embeds for one message before it goes out: only the last is sent
+        for n in range(3):
+            scheduler.submit(1, 10, f"embed {n}")
+        scheduler.submit(1, 11, "other message")
+        scheduler.submit(2, 20, "other channel")
+        scheduler.submit(1, 12, "forgotten")
+        scheduler.forget(12)
+        await asyncio.sleep(0.35)
+        await scheduler.stop()
+
+    asyncio.run(main())
+    first, second = channels[1].edits
+    assert [(m, e) for m, e, _ in channels[1].edits] == [(10, "embed 2"), (11, "other message")]
+    assert second[2] - first[2] >= 0.09  # one edit per channel per interval
+    assert [(m, e) for m, e, _ in channels[2].edits] == [(20, "other channel")]
+
+def test_replaced_rotation_releases_old_messages(gag, channels, monkeypatch):
+    monkeypatch.setattr(gag, "edit_scheduler", gag.EditScheduler())
+    monkeypatch.setattr(gag, "registry", gag.ChannelRegistry())
+    monkeypatch.setitem(gag.active_events, "stock", {})
+    for channel_id in channels:
+        gag.registry.add(1, "seed", channel_id)
+
+    async def main():
+        now = time.time()
+        for n in range(3):
+            start = now + n * 300
+            await gag.deliver_stock({"key": "seed", "start_ts": start, "end_ts": start + 300,
+                                     "items": [{"item_id": "carrot", "display_name": "Carrot", "quantity": 1}]})
+            tracked = gag.active_events["stock"]["seed"]
+            gag.edit_scheduler.attach((m.channel_id, m.message_id) for m in tracked.messages.values())
+
+    asyncio.run(main())
+    assert len(gag.active_events["stock"]["seed"].messages) == 2
+    assert len(gag.edit_scheduler._partials) == 2
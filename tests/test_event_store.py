@@ -0,0 +1,91 @@
+import asyncio
+import time
+
+import event_store
+from event_store import EventStore
+
+def test_rows_queued_during_a_write_are_flushed(tmp_path, monkeypatch):
+    monkeypatch.setattr(event_store, "FLUSH_INTERVAL", 0.05)
+
+    async def main():
+        store = EventStore(str(tmp_path / "events.db"))
+        store.open()
+        write = store._write
+
+        def slow_write(batch):
+            time.sleep(0.2)
+            write(batch)
+        store._write = slow_write
+
+        store.record_announcement(1, None, "first")
+        await asyncio.sleep(0.1)  # the timer's flush is now inside the slow write
+        store.record_announcement(2, None, "second")
+        await asyncio.sleep(0.6)
+        pending = len(store._pending)
+        rows = store._query("SELECT message FROM announcements ORDER BY ts")
+        await store.close()
+        return pending, rows
+
+    pending, rows = asyncio.run(main())
+    assert pending == 0
+    assert rows == [("first",), ("second",)]
+
+def test_active_deliveries_round_trip(tmp_path):
+    async def main():
+        store = EventStore(str(tmp_path / "events.db"))
+        store.open()
+        end = time.time() + 600
+        store.record_announcement(100, end, "hello")
+        store.record_delivery("announcements", 100, end, {5: 50, 6: 60})
+        store.forget_delivery("announcements", 100, 6)
+        await store.flush()
+        active = store.load_active()
+        await store.close()
+        return active
+
+    announcement = asyncio.run(main())["announcements"][100]
+    assert announcement["messages"] == {5: 50}
+
+def test_open_ended_announcements(tmp_path):
+    path = str(tmp_path / "events.db")
+
+    async def record(store, ts):
+        store.record_announcement(ts, None, f"note {ts}")
+        store.record_delivery("announcements", ts, None, {5: ts * 10})
+        await store.flush()
+
+    async def main():
+        store = EventStore(path)
+        store.open()
+        await record(store, 100)
+        first = store.load_active()["announcements"]
+        await record(store, 200)  # supersedes the first
+        second = store.load_active()["announcements"]
+        history = store._query("SELECT ts, end_ts FROM announcements ORDER BY ts")
+        await store.close()
+        return first, second, history
+
+    first, second, history = asyncio.run(main())
+    assert first[100]["messages"] == {5: 1000}
+    assert list(second) == [200]
+    assert second[200]["messages"] == {5: 2000}
+    assert history == [(100, 200), (200, None)]
+
+def test_open_cleans_up_superseded_announcements(tmp_path):
+    path = str(tmp_path / "events.db")
+    store = EventStore(path)
+    store.open()
+    # Rows left by an earlier version that never closed superseded announcements
+    for ts in (100, 200):
+        store._write([
+            ("INSERT INTO announcements (ts, end_ts, message) VALUES (?, NULL, 'x')", (ts,)),
+            ("INSERT INTO tracked_messages VALUES ('announcements', ?, 5, ?, NULL)", (ts, ts)),
+        ])
+    asyncio.run(store.close())
+
+    store = EventStore(path)
+    store.open()
+    active = store.load_active()["announcements"]
+    asyncio.run(store.close())
+    assert list(active) == [200]
+    assert active[200]["messages"] == {5: 200}
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+@pytest.fixture
+def serve(gag, monkeypatch):
+    """Run `main(url)` against a local server whose /feed handler is `handler`"""
+    from aiohttp import web
+    monkeypatch.setattr(gag, "UPSTREAM_BACKOFF", 0.01)
+
+    def run(handler, main):
+        async def wrapper():
+            app = web.Application()
+            app.router.add_get("/feed", handler)
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            port = site._server.sockets[0].getsockname()[1]
+            try:
+                return await main(f"http://127.0.0.1:{port}/feed")
+            finally:
+                await gag.close_http_session()
+                await runner.cleanup()
+        return asyncio.run(wrapper())
+    return run
+
+def decode(body: bytes):
+    return body.decode()
+
+def test_snapshot_serves_stale_data_when_upstream_fails(gag, serve):
+    from aiohttp import web
+    responses = [web.Response(body=b"first", content_type="application/json")]
+
+    async def handler(request):
+        if responses:
+            return responses.pop()
+        # Not JSON, and not valid in the charset it claims either
+        return web.Response(body=b"\xff\xfe oops", content_type="text/html", charset="utf-8")
+
+    async def main(url):
+        feed = gag.FeedSnapshot("Test", url, decode, ttl=0)
+        first = await feed.get()
+        stale = await feed.get()
+        return first, stale, feed
+
+    first, stale, feed = serve(handler, main)
+    assert first == stale == "first"
+    assert feed.stale and feed.version == 1
+    assert feed.breaker.failures == 1
+
+def test_unexpected_decode_errors_count_as_failed_polls(gag, serve):
+    from aiohttp import web
+
+    async def handler(request):
+        return web.Response(body=b"{}", content_type="application/json")
+
+    def broken(body: bytes):
+        raise RuntimeError("decoder bug")
+
+    async def main(url):
+        feed = gag.FeedSnapshot("Test", url, broken, ttl=0)
+        return await feed.get(), feed
+
+    data, feed = serve(handler, main)
+    assert data is None and not feed.stale
+    assert feed.breaker.failures == 1
@@ -0,0 +1,120 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+def test_circuit_breaker_opens_and_backs_off(gag):
+    breaker = gag.CircuitBreaker(threshold=2, cooldown=10, max_cooldown=25)
+    assert not breaker.record_failure()
+    assert breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    breaker.opened_at -= 10  # cooldown over: one trial call goes through
+    assert breaker.state == "half_open" and breaker.allow()
+    assert breaker.record_failure()
+    assert breaker.current_cooldown == 20
+    breaker.opened_at -= 20
+    breaker.record_failure()
+    assert breaker.current_cooldown == 25  # capped
+
+    breaker.opened_at -= 25
+    assert breaker.record_success()
+    assert breaker.state == "closed" and breaker.current_cooldown == 10
+    assert not breaker.record_success()
+
+def test_poll_controller_follows_change_cadence(gag):
+    poll = gag.PollController("test", 10, 600, 300)
+    assert poll.interval(now=0) == 300  # nothing observed yet
+
+    for ts in (1000, 1100, 1200, 1150, None):  # older and missing timestamps are ignored
+        poll.observe(ts)
+    assert poll.mean_gap == 100
+    assert poll.interval(now=1250) == 20    # sleep until the next change gets close
+    assert poll.interval(now=1290) == 10    # a change is due: poll at the minimum
+    assert poll.interval(now=1700) == 100   # overdue: back off
+    assert poll.interval(now=9999) == 600   # capped
+
+    delay = poll.plan()
+    assert poll.next_due == pytest.approx(time.time() + delay, abs=1)
+    assert not poll.due(poll.next_due - 1) and poll.due(poll.next_due)
+
+def test_watch_registry(gag):
+    watches = gag.WatchRegistry()
+    user, role = ("user", 1), ("role", 5, 9)
+    assert watches.add(user, "carrot")
+    assert not watches.add(user, "carrot")
+    watches.add(user, "tomato")
+    watches.add(role, "carrot")
+    assert len(watches) == 3
+    assert watches.match(["carrot", "daffodil"]) == {user: ["carrot"], role: ["carrot"]}
+
+    changes = watches.take_changes()
+    assert changes == {("users", "1"): ["carrot", "tomato"], ("roles", "5:9"): ["carrot"]}
+    assert not watches.has_changes
+
+    assert watches.remove_channel(5) == 1
+    assert watches.match(["carrot"]) == {user: ["carrot"]}
+    assert watches.take_changes() == {("roles", "5:9"): []}
+
+    saved = gag.merge_watch_changes(watches.to_dict(), {("roles", "7:8"): ["egg"]})
+    loaded = gag.WatchRegistry()
+    loaded.load_dict(saved)
+    assert loaded.match(["egg", "tomato"]) == {("role", 7, 8): ["egg"], user: ["tomato"]}
+    assert not loaded.has_changes
+
+def test_debounced_writer_saves_changes_made_during_a_write(gag, tmp_path, monkeypatch):
+    write = gag.write_json_atomic
+
+    def slow_write(path, data):
+        time.sleep(0.2)
+        write(path, data)
+    monkeypatch.setattr(gag, "write_json_atomic", slow_write)
+    path = str(tmp_path / "state.json")
+    state = {"v": 0}
+
+    async def main():
+        writer = gag.DebouncedWriter(path, lambda: dict(state), delay=0.05)
+        state["v"] = 1
+        writer.mark_dirty()
+        await asyncio.sleep(0.15)  # the first save is now writing
+        state["v"] = 2
+        writer.mark_dirty()
+        await asyncio.sleep(0.6)
+        with open(path) as f:
+            return json.load(f)
+
+    assert asyncio.run(main()) == {"v": 2}
+
+def test_watch_dms_fetch_users_under_the_delivery_limit(gag, monkeypatch):
+    watches = gag.WatchRegistry()
+    for user_id in range(10):
+        watches.add(("user", user_id), "carrot")
+    monkeypatch.setattr(gag, "watches", watches)
+    in_flight = []
+    sent = []
+
+    class User:
+        def __init__(self, user_id):
+            self.id = user_id
+
+        async def send(self, embed=None):
+            sent.append(self.id)
+
+    async def fetch_user(user_id):
+        in_flight.append(1)
+        await asyncio.sleep(0.01)
+        assert len(in_flight) <= 2
+        in_flight.pop()
+        return User(user_id)
+    monkeypatch.setattr(gag.bot, "get_user", lambda user_id: None)
+    monkeypatch.setattr(gag.bot, "fetch_user", fetch_user)
+
+    async def main():
+        monkeypatch.setattr(gag, "delivery_semaphore", asyncio.Semaphore(2))
+        notifier = gag.WatchNotifier(delay=0)
+        assert notifier.queue("seed", [{"item_id": "carrot", "display_name": "Carrot", "quantity": 2}], time.time()) == 10
+        await notifier.flush()
+
+    asyncio.run(main())
+    assert sorted(sent) == list(range(10))
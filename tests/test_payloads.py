@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from payloads import PayloadError, decode_stock, decode_weather
+
+KEYS = ("seed_stock", "gear_stock")
+
+def item(item_id: str, **fields) -> dict:
+    return {"item_id": item_id, "display_name": item_id.title(), "quantity": 1,
+            "start_date_unix": 100, "end_date_unix": 400, **fields}
+
+def encode(payload) -> bytes:
+    return json.dumps(payload).encode()
+
+def test_stock_rotations_and_notification():
+    body = encode([{
+        "seed_stock": [item("carrot"), item("tomato", end_date_unix=500)],
+        "gear_stock": [],
+        "notification": [{"message": "hello", "timestamp": 50, "end_timestamp": 90}],
+    }])
+    payload = decode_stock(body, KEYS)
+    assert list(payload.rotations) == ["seed_stock"]
+    rotation = payload.rotations["seed_stock"]
+    assert [i.item_id for i in rotation.items] == ["carrot", "tomato"]
+    assert (rotation.start_ts, rotation.end_ts) == (100, 500)
+    assert rotation.items[0].to_dict() == item("carrot")
+    note = payload.notification
+    assert (note.message, note.ts, note.end_ts) == ("hello", 50, 90)
+
+def test_stock_ignores_unused_categories():
+    body = encode({"seed_stock": [item("carrot")],
+                   "travelingmerchant_stock": {"items": []},
+                   "egg_stock": [item("egg", quantity="3")]})
+    assert list(decode_stock(body, KEYS).rotations) == ["seed_stock"]
+
+def test_stock_skips_bad_entries():
+    body = encode({"seed_stock": [item("carrot"), item("bad", quantity="3"), 7],
+                   "gear_stock": {"items": []},
+                   "notification": [{"message": 5}]})
+    payload = decode_stock(body, KEYS)
+    assert [i.item_id for i in payload.rotations["seed_stock"].items] == ["carrot"]
+    assert payload.notification is None
+
+@pytest.mark.parametrize("body", [b"not json", b"[1]", b'"text"'])
+def test_stock_rejects_non_objects(body):
+    with pytest.raises(PayloadError):
+        decode_stock(body, KEYS)
+
+def test_weather_events():
+    body = encode({"weather": [
+        {"weather_id": "rain", "weather_name": "Rain", "active": True, "start_duration_unix": 10, "duration": 50},
+        {"weather_name": "No id"},
+        "junk",
+        {"weather_id": "bad", "duration": "long"},
+    ]})
+    events = decode_weather(body).events
+    assert [e.weather_id for e in events] == ["rain"]
+    assert events[0].end_ts == 60  # derived from the duration
+    assert events[0].to_dict()["weather_name"] == "Rain"
@@ -0,0 +1,89 @@
+import asyncio
+
+from pipeline import EventPipeline
+
+class FakeFeed:
+    """Stands in for a FeedSnapshot: returns `payload`, whose version the test moves"""
+
+    name = "fake"
+
+    def __init__(self):
+        self.payload = None
+        self.version = 0
+        self.gets = 0
+
+    async def get(self, max_age=None):
+        self.gets += 1
+        await asyncio.sleep(0)
+        return self.payload
+
+    def publish(self, payload):
+        self.payload = payload
+        self.version += 1
+
+def test_each_version_is_diffed_once():
+    async def main():
+        feed = FakeFeed()
+        diffs = []
+        received = []
+        pipeline = EventPipeline()
+        pipeline.add_feed(feed, lambda payload: diffs.append(payload) or [{"kind": "x", "value": payload}])
+
+        async def consume(event):
+            received.append(event["value"])
+        pipeline.subscribe("test", consume)
+        pipeline.start()
+
+        assert await pipeline.poll(feed) == []  # no payload yet
+        feed.publish("a")
+        results = await asyncio.gather(pipeline.poll(feed), pipeline.poll(feed), pipeline.poll(feed))
+        assert sorted(len(r) for r in results) == [0, 0, 1]
+        assert await pipeline.poll(feed) == []
+        feed.publish("b")
+        await pipeline.poll(feed)
+        await pipeline.drain()
+        await pipeline.stop()
+        return diffs, received
+
+    diffs, received = asyncio.run(main())
+    assert diffs == ["a", "b"]
+    assert received == ["a", "b"]
+
+def test_failing_consumer_does_not_stop_others():
+    async def main():
+        feed = FakeFeed()
+        good = []
+        pipeline = EventPipeline()
+        pipeline.add_feed(feed, lambda payload: [{"kind": "x", "value": payload}])
+
+        async def fail(event):
+            raise RuntimeError("boom")
+
+        async def record(event):
+            good.append(event["value"])
+        pipeline.subscribe("fail", fail)
+        pipeline.subscribe("record", record)
+        pipeline.start()
+
+        for payload in ("a", "b"):
+            feed.publish(payload)
+            await pipeline.poll(feed)
+        await pipeline.stop()
+        return good
+
+    assert asyncio.run(main()) == ["a", "b"]
+
+def test_stop_gives_up_on_stuck_consumers():
+    async def main():
+        pipeline = EventPipeline()
+        stuck = asyncio.Event()
+
+        async def wait(event):
+            await stuck.wait()
+        pipeline.subscribe("stuck", wait)
+        pipeline.start()
+        pipeline.emit({"kind": "x"})
+        await pipeline.stop(timeout=0.05)
+        return pipeline._tasks
+
+    assert asyncio.run(main()) == {}
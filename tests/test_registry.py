@@ -0,0 +1,43 @@
+def test_channels_by_category_across_guilds(gag):
+    registry = gag.ChannelRegistry()
+    registry.add(1, "seed", 10)
+    registry.add(1, "seed", 11)
+    registry.add(2, "seed", 20)
+    registry.add(2, "weather", 20)
+    assert registry.channels_for("seed") == {10, 11, 20}
+    assert registry.guild_channels(1, "seed") == {10, 11}
+
+    assert registry.remove_channel(2, 20) == ["seed", "weather"]
+    assert not registry.remove(2, "seed", 20)
+    assert registry.channels_for("seed") == {10, 11}
+    assert registry.channels_for("weather") == set()
+
+    registry.remove_guild(1)
+    assert registry.channels_for("seed") == set()
+    assert registry.to_dict() == {}
+
+def test_changes_merge_per_guild(gag):
+    registry = gag.ChannelRegistry()
+    registry.add(1, "seed", 10)
+    registry.add(2, "gear", 20)
+    saved = gag.merge_keyed({"3": {"egg": [30]}}, registry.take_changes())
+    assert saved == {"1": {"seed": [10]}, "2": {"gear": [20]}, "3": {"egg": [30]}}
+
+    registry.remove_guild(2)
+    saved = gag.merge_keyed(saved, registry.take_changes())
+    assert saved == {"1": {"seed": [10]}, "3": {"egg": [30]}}
+
+    # Other shards' guilds and unknown categories are left out on load
+    loaded = gag.ChannelRegistry()
+    loaded.load_dict({**saved, "4": {"nonsense": [40]}}, keep=lambda guild_id: guild_id != 3)
+    assert loaded.to_dict() == {"1": {"seed": [10]}}
+    assert loaded.take_changes() == {}
+
+def test_legacy_channels_are_adopted(gag):
+    registry = gag.ChannelRegistry()
+    registry.add(gag.UNKNOWN_GUILD, "seed", 10)
+    registry.add(gag.UNKNOWN_GUILD, "gear", 99)
+    assert registry.adopt_unknown({10: 1}.get)
+    assert registry.guild_channels(1, "seed") == {10}
+    assert registry.guild_channels(gag.UNKNOWN_GUILD, "gear") == {99}  # not visible yet
+    assert registry.channels_for("seed") == {10}
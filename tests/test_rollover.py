@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+import pytest
+
+@pytest.fixture
+def scheduler(gag, monkeypatch):
+    monkeypatch.setattr(gag, "ROLLOVER_JITTER", 0)
+    monkeypatch.setattr(gag, "ROLLOVER_RETRY_DELAY", 0.01)
+    scheduler = gag.RolloverScheduler()
+    monkeypatch.setattr(gag, "rollover_scheduler", scheduler)
+    return scheduler
+
+def test_deadlines_fire_in_order_once(scheduler):
+    fired = []
+
+    async def rollover(category, end_ts):
+        fired.append((category, end_ts))
+    scheduler._rollover = rollover
+
+    async def main():
+        scheduler.start()
+        now = time.time()
+        scheduler.schedule("seed", now + 0.2)
+        scheduler.schedule("gear", now + 0.1)
+        scheduler.schedule("seed", now + 0.05)  # supersedes the first seed deadline
+        scheduler.schedule("gear", now + 0.1)   # unchanged: no second entry
+        await asyncio.sleep(0.35)
+        scheduler.stop()
+        return now
+
+    now = asyncio.run(main())
+    assert fired == [("seed", now + 0.05), ("gear", now + 0.1)]
+
+class Ingest:
+    """Finds the new rotation on the `found_on`-th poll, as the stock differ would"""
+
+    def __init__(self, scheduler, found_on: int):
+        self.scheduler = scheduler
+        self.found_on = found_on
+        self.polls = 0
+
+    async def poll(self, feed, max_age=None):
+        self.polls += 1
+        if self.polls == self.found_on:
+            self.scheduler.schedule("seed", time.time() + 300)
+        return []
+
+def test_rollover_polls_until_the_new_rotation(gag, scheduler, monkeypatch):
+    ingest = Ingest(scheduler, found_on=3)
+    monkeypatch.setattr(gag, "ingest", ingest)
+    monkeypatch.setattr(gag.stock_feed, "stale", False)
+    asyncio.run(scheduler._rollover("seed", time.time()))
+    assert ingest.polls == 3
+
+def test_rollover_leaves_a_failing_upstream_to_the_breaker(gag, scheduler, monkeypatch):
+    ingest = Ingest(scheduler, found_on=0)
+    monkeypatch.setattr(gag, "ingest", ingest)
+    monkeypatch.setattr(gag.stock_feed, "stale", True)
+    asyncio.run(scheduler._rollover("seed", time.time()))
+    assert ingest.polls == 1
@@ -0,0 +1,43 @@
+import asyncio
+import logging
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from telemetry import Counter, Gauge, Histogram, RateLimitCounter, render_metrics  # noqa: E402
+
+def test_rate_limits_counted_once_per_429():
+    counter = Counter("test_rate_limits_total", "test")
+    logger = logging.getLogger("test.discord.http")
+    logger.propagate = False
+    logger.addHandler(RateLimitCounter(counter))
+
+    async def main():
+        fmt = 'We are being rate limited. %s %s responded with 429. Retrying in %.2f seconds.'
+        logger.warning(fmt, "POST", "/channels/1/messages", 1.0)
+        await asyncio.sleep(0)
+        logger.warning(fmt, "POST", "/channels/1/messages", 1.0)
+        logger.warning('Global rate limit has been hit. Retrying in %.2f seconds.', 1.0)
+        await asyncio.sleep(0)
+        logger.warning('Webhook ID %s is rate limited. Retrying in %.2f seconds.', 5, 1.0)
+        logger.warning('A rate limit bucket (%s) has been exhausted. Pre-emptively rate limiting...', "x")
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+    assert dict(counter._values) == {(("scope", "route"),): 2, (("scope", "global"),): 1}
+
+def test_render_metrics():
+    requests = Counter("test_requests_total", "Requests")
+    requests.inc(feed="stock")
+    requests.inc(2, feed="stock")
+    Gauge("test_open", "Open", fn=lambda: {(("feed", "stock"),): 1})
+    latency = Histogram("test_latency_seconds", "Latency", buckets=(0.1, 1))
+    latency.observe(0.5, feed="stock")
+
+    text = render_metrics()
+    assert 'test_requests_total{feed="stock"} 3' in text
+    assert 'test_open{feed="stock"} 1' in text
+    assert 'test_latency_seconds_bucket{feed="stock",le="0.1"} 0' in text
+    assert 'test_latency_seconds_bucket{feed="stock",le="1"} 1' in text
+    assert 'test_latency_seconds_count{feed="stock"} 1' in text
@@ -0,0 +1,48 @@
+import pytest
+
+def test_clock_text(gag):
+    assert gag.time_ago(1000, now=1000) == "0 seconds ago"
+    assert gag.time_ago(1000, now=1061) == "1 minute ago"
+    assert gag.time_ago(1000, now=1000 + 7200) == "2 hours ago"
+    assert gag.format_countdown(900) == "15m"
+    assert gag.format_countdown(125) == "2m 5s"
+
+def test_stock_template_renders_static_and_clock_fields(gag):
+    items = [{"item_id": "carrot", "display_name": "Carrot", "quantity": 3}, {"item_id": "tomato"}]
+    template = gag.stock_template(items, "Seeds", 1000, 1300)
+    assert template.description == "**Carrot** x3\n**tomato** x0"
+
+    clock = template.clock(1100)
+    assert clock == ("1 minute ago", "3m 20s")
+    embed = template.render(clock)
+    assert embed.title == "🛒 Seeds"
+    assert [(f.name, f.value) for f in embed.fields] == [("🕒 Restocked", "1 minute ago"),
+                                                         ("⏱️ Next Restock", "3m 20s")]
+
+    # Once the event has ended the countdown field is left out
+    assert [f.name for f in template.render(template.clock(1400)).fields] == ["🕒 Restocked"]
+
+def test_clock_only_changes_when_the_text_does(gag):
+    # More than 10 minutes out the countdown has no seconds, so a few seconds later is the same clock
+    template = gag.stock_template([], "Seeds", 1000, 5000)
+    assert template.clock(1130) == template.clock(1135)
+    assert template.clock(4500) != template.clock(4510)
+
+def test_equal_clocks_render_equal_embeds(gag):
+    template = gag.announcement_template("Update soon", 1000, None)
+    assert template.clock(5000) == ("1 hour ago", None)
+    assert template.render(template.clock(5000)).to_dict() == template.render(template.clock(5001)).to_dict()
+
+def test_weather_template_derives_the_end(gag):
+    w = {"weather_id": "rain", "weather_name": "Rain", "start_duration_unix": 1000, "duration": 600}
+    assert gag.weather_end(w) == 1600
+    template = gag.weather_template(w)
+    assert template.title == "🌦️ Rain" and template.end_ts == 1600
+
+def test_records_are_interned_and_immutable(gag):
+    items = [{"item_id": "carrot", "display_name": "Carrot", "quantity": 1}]
+    record = gag.stock_record("seed", 1000, 1300, items)
+    assert gag.stock_record("seed", 1000, 1300, []) is record  # the template is built once
+    assert gag.stock_record("seed", 1300, 1600, items) is not record
+    with pytest.raises(AttributeError):
+        record.end_ts = 0
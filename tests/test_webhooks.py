@@ -0,0 +1,105 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+discord = pytest.importorskip("discord")
+
+from webhooks import UNKNOWN_MESSAGE, UNKNOWN_WEBHOOK, WebhookPool  # noqa: E402
+
+def not_found(code: int) -> discord.NotFound:
+    return discord.NotFound(SimpleNamespace(status=404, reason="Not Found"), {"code": code, "message": "Unknown"})
+
+class Edits:
+    """Stands in for Webhook.edit_message; `fail_with` makes the next edit raise"""
+
+    def __init__(self):
+        self.calls = []
+        self.fail_with = None
+
+    async def __call__(self, webhook, message_id, **kwargs):
+        if self.fail_with is not None:
+            error, self.fail_with = self.fail_with, None
+            raise error
+        self.calls.append((webhook.id, message_id))
+
+@pytest.fixture
+def edits(monkeypatch):
+    edits = Edits()
+
+    async def edit_message(self, message_id, **kwargs):
+        await edits(self, message_id, **kwargs)
+    monkeypatch.setattr(discord.Webhook, "edit_message", edit_message)
+    return edits
+
+def run(pool: WebhookPool, main):
+    async def wrapper():
+        try:
+            return await main()
+        finally:
+            await pool.close()
+    return asyncio.run(wrapper())
+
+class Channel:
+    def __init__(self, channel_id: int, existing=(), fail=False):
+        self.id = channel_id
+        self.guild = SimpleNamespace(me=SimpleNamespace(id=1))
+        self.existing = list(existing)
+        self.fail = fail
+        self.created = 0
+
+    async def webhooks(self):
+        if self.fail:
+            raise discord.Forbidden(SimpleNamespace(status=403, reason="Forbidden"), "Missing Permissions")
+        return self.existing
+
+    async def create_webhook(self, name, reason=None):
+        self.created += 1
+        return SimpleNamespace(id=70, token="new", name=name, user=SimpleNamespace(id=1))
+
+def test_edits_messages_sent_before_a_restart(edits):
+    pool = WebhookPool("test")
+    pool.load_dict({"5": {"id": 50, "token": "secret"}})
+
+    async def main():
+        return await pool.edit(5, 99, embed=None), await pool.edit(6, 99, embed=None)
+
+    assert run(pool, main) == (True, False)  # channel 6 has no webhook
+    assert edits.calls == [(50, 99)]
+
+def test_edit_falls_back_for_messages_the_webhook_did_not_send(edits):
+    changes = []
+    pool = WebhookPool("test", on_change=lambda: changes.append(1))
+    pool.load_dict({"5": {"id": 50, "token": "secret"}})
+
+    async def main():
+        edits.fail_with = not_found(UNKNOWN_MESSAGE)
+        first = await pool.edit(5, 98, embed=None)
+        second = await pool.edit(5, 98, embed=None)  # known to be the bot's: no webhook call
+        edits.fail_with = not_found(UNKNOWN_WEBHOOK)
+        gone = await pool.edit(5, 99, embed=None)
+        return first, second, gone
+
+    assert run(pool, main) == (False, False, False)
+    assert edits.calls == []
+    assert changes and pool.take_changes() == {"5": {}}
+    assert len(pool) == 0
+
+def test_provisioning(edits):
+    pool = WebhookPool("test")
+    thread = SimpleNamespace(id=4)  # no create_webhook
+    reuse = Channel(5, existing=[SimpleNamespace(id=60, token="old", name="test", user=SimpleNamespace(id=1))])
+    create = Channel(6)
+    forbidden = Channel(7, fail=True)
+
+    async def main():
+        assert all(pool.get(ch) is None for ch in (thread, reuse, create, forbidden))
+        await asyncio.gather(*pool._provisioning.values())
+        return {ch.id: pool.get(ch) for ch in (thread, reuse, create, forbidden)}
+
+    got = run(pool, main)
+    assert got[4] is None and got[7] is None
+    assert (got[5].id, got[6].id) == (60, 70)
+    assert (reuse.created, create.created) == (0, 1)
+    assert pool.take_changes() == {"5": {"id": 60, "token": "old"}, "6": {"id": 70, "token": "new"}}
+    assert list(pool._failed) == [7]
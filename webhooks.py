@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import time
+
+import aiohttp
+import discord
+
+log = logging.getLogger(__name__)
+
+WEBHOOK_CONCURRENCY = 50    # webhook requests in flight across all channels
+WEBHOOK_PROVISION   = 2     # channels being given a webhook at once; this uses the bot's own rate limit
+WEBHOOK_RETRY       = 3600  # seconds before retrying a channel where creating a webhook failed
+
+# Discord JSON error codes
+UNKNOWN_MESSAGE = 10008
+UNKNOWN_WEBHOOK = 10015
+
+class WebhookPool:
+    """Per-channel webhooks for alert delivery, on a connection pool of their own.
+
+    Webhook requests aren't authenticated as the bot, so they don't count
+    against its global rate limit; discord.py keeps a rate-limit bucket per
+    webhook and `concurrency` caps requests in flight across all of them.
+
+    Channels are given a webhook in the background, a few at a time, since
+    finding or creating one goes through the bot's API. Until a channel has
+    one, `get` returns None and the caller sends as the bot.
+    """
+
+    def __init__(self, name: str, on_change=None, concurrency: int = WEBHOOK_CONCURRENCY,
+                 provision_concurrency: int = WEBHOOK_PROVISION):
+        self.name = name
+        self.on_change = on_change
+        self.concurrency = concurrency
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._provision_semaphore = asyncio.Semaphore(provision_concurrency)
+        self._session = None
+        self._credentials = {}   # channel_id -> (webhook_id, token)
+        self._webhooks = {}      # channel_id -> discord.Webhook
+        self._provisioning = {}  # channel_id -> task finding or creating its webhook
+        self._failed = {}        # channel_id -> when creating a webhook last failed
+        self._foreign = set()    # message_ids the channel's webhook didn't send
+        self._touched = set()
+
+    def __len__(self) -> int:
+        return len(self._credentials)
+
+    def get(self, channel) -> discord.Webhook:
+        """The channel's webhook, or None while it's being provisioned or can't be"""
+        webhook = self._webhook_for(channel.id)
+        if webhook is not None:
+            return webhook
+        if not hasattr(channel, "create_webhook"):
+            return None  # threads and partial channels can't own a webhook
+        if channel.id not in self._provisioning and time.time() - self._failed.get(channel.id, 0) > WEBHOOK_RETRY:
+            task = self._provisioning[channel.id] = asyncio.create_task(self._provision(channel))
+            task.add_done_callback(lambda _, c=channel.id: self._provisioning.pop(c, None))
+        return None
+
+    def _webhook_for(self, channel_id: int) -> discord.Webhook:
+        """The channel's known webhook, built from saved credentials on first use"""
+        webhook = self._webhooks.get(channel_id)
+        if webhook is None:
+            credentials = self._credentials.get(channel_id)
+            if credentials is not None:
+                webhook = self._webhooks[channel_id] = discord.Webhook.partial(*credentials, session=self._get_session())
+        return webhook
+
+    async def _provision(self, channel):
+        async with self._provision_semaphore:
+            try:
+                # Reuse ours if an earlier run made one, so state loss doesn't pile up webhooks
+                me = channel.guild.me
+                webhook = discord.utils.find(
+                    lambda w: w.token and w.user and w.user.id == me.id and w.name == self.name,
+                    await channel.webhooks()
+                )
+                if webhook is None:
+                    webhook = await channel.create_webhook(name=self.name, reason="Alert delivery")
+            except Exception as e:
+                # Record any failure, not just API errors, so the channel isn't retried on every alert
+                self._failed[channel.id] = time.time()
+                log.info("No webhook for channel %s, alerts stay on the bot: %s", channel.id, e)
+                return
+        self._failed.pop(channel.id, None)
+        self._set(channel.id, (webhook.id, webhook.token))
+        log.debug("Webhook ready for channel %s", channel.id)
+
+    async def send(self, webhook: discord.Webhook, **kwargs) -> discord.WebhookMessage:
+        async with self._semaphore:
+            return await webhook.send(wait=True, **kwargs)
+
+    async def edit(self, channel_id: int, message_id: int, **kwargs) -> bool:
+        """Edit a message through its channel's webhook; False if the bot has to edit it instead"""
+        # Credentials loaded at startup cover messages the webhook sent before a restart
+        webhook = self._webhook_for(channel_id)
+        if webhook is None or message_id in self._foreign:
+            return False
+        try:
+            async with self._semaphore:
+                await webhook.edit_message(message_id, **kwargs)
+            return True
+        except discord.NotFound as e:
+            if e.code == UNKNOWN_WEBHOOK:
+                self.drop(channel_id)
+            elif e.code == UNKNOWN_MESSAGE:
+                # Sent before the webhook existed, or deleted; the bot's edit tells which
+                self._foreign.add(message_id)
+            else:
+                raise
+            return False
+
+    def forget(self, message_id: int):
+        self._foreign.discard(message_id)
+
+    def drop(self, channel_id: int):
+        """Forget a channel's webhook, e.g. after someone deleted it; a new one is made on next use"""
+        self._webhooks.pop(channel_id, None)
+        if self._credentials.pop(channel_id, None) is not None:
+            self._touched.add(channel_id)
+            if self.on_change:
+                self.on_change()
+
+    def _set(self, channel_id: int, credentials: tuple):
+        self._credentials[channel_id] = credentials
+        self._webhooks.pop(channel_id, None)
+        self._touched.add(channel_id)
+        if self.on_change:
+            self.on_change()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.concurrency))
+        return self._session
+
+    async def close(self):
+        for task in list(self._provisioning.values()):
+            task.cancel()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    def take_changes(self) -> dict:
+        """{channel_id: {"id", "token"}} for channels changed since the last call; {} marks a dropped one"""
+        changes = {}
+        for channel_id in self._touched:
+            credentials = self._credentials.get(channel_id)
+            changes[str(channel_id)] = {"id": credentials[0], "token": credentials[1]} if credentials else {}
+        self._touched.clear()
+        return changes
+
+    def load_dict(self, data: dict):
+        for channel_id, webhook in data.items():
+            self._credentials[int(channel_id)] = (webhook["id"], webhook["token"])